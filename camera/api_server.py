@@ -19,6 +19,15 @@ import uvicorn
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cad"))
+
+from fastapi.concurrency import run_in_threadpool
+from cad_extractor import extract_cad, write_measurements_csv
+from cad_catalog import load_catalog
+from part_index import PartIndex
+from templates import get_templates
+from preview import FORMATS as PREVIEW_FORMATS, preview_file
+from fingerprint import VISION_SCRIPTS
 
 app = FastAPI(title="EyeQ Inspection API", version="1.0.0")
 
@@ -35,10 +44,17 @@ app.add_middleware(
 BASE_DIR = Path(__file__).parent
 CAD_INPUT_DIR = BASE_DIR / "cad_inputs"
 CAD_INPUT_DIR.mkdir(exist_ok=True)
+TEMPLATE_MM_PER_PX = 0.1        # scale templates are pre-rendered at on upload
+PRECOMPUTE_WAIT_S = 120         # how long an inspection waits for a running pre-extraction
 
 # Global state
 inspection_status: Dict[str, any] = {}
 active_inspections: Dict[str, subprocess.Popen] = {}
+latest_cad_dimensions: Dict[str, float] = {}
+cad_catalog: Optional[pd.DataFrame] = None
+part_index: Optional[PartIndex] = None
+cad_file_status: Dict[str, Dict] = {}
+cad_file_extracted: Dict[str, threading.Event] = {}
 
 # Pydantic models
 class InspectionRequest(BaseModel):
@@ -55,9 +71,17 @@ class MeasurementUpdate(BaseModel):
     measurements: Dict[str, float]
     status: str
 
+class IdentifyPartRequest(BaseModel):
+    measurements: Dict[str, float]
+    k: int = 5
+    max_distance_mm: Optional[float] = None
+
 # Helper functions
 def get_cad_dimensions() -> Dict:
-    """Load CAD dimensions from CSV"""
+    """CAD dimensions of the last extraction (falls back to the CSV)"""
+    if latest_cad_dimensions:
+        return dict(latest_cad_dimensions)
+
     cad_file = BASE_DIR / "dxf_measurements.csv"
     if not cad_file.exists():
         return {}
@@ -70,6 +94,54 @@ def get_cad_dimensions() -> Dict:
         dimensions[dim_type] = float(value)
     return dimensions
 
+def extract_cad_dimensions(cad_file_path: str):
+    """Run CAD extraction in-process and publish the result"""
+    cad = extract_cad(cad_file_path)
+
+    # vision scripts and the comparison step still read the CSV
+    write_measurements_csv(cad.rows, BASE_DIR / "dxf_measurements.csv")
+
+    latest_cad_dimensions.clear()
+    latest_cad_dimensions.update(cad.dimensions)
+    return cad
+
+def precompute_cad(cad_file_path: str, status: Dict, extracted: threading.Event):
+    """
+    Parse, cache and render templates for an uploaded CAD file. `extracted`
+    is set as soon as the dimensions are cached (inspections only need
+    those); status / extracted belong to this upload, not a later one.
+    """
+    try:
+        status.update(status="extracting", message="Parsing CAD geometry...")
+        cad = extract_cad(cad_file_path)
+        status.update(
+            part=cad.part,
+            component_type=cad.component_type,
+            dimensions=cad.dimensions,
+        )
+    except Exception as e:
+        status.update(status="error", message=f"Pre-extraction failed: {str(e)}",
+                      updated=time.time())
+        return
+    finally:
+        extracted.set()
+
+    # the dimensions are usable from here on: render failures are only warnings
+    status.update(status="rendering_templates", message="Rendering CAD templates...")
+    warnings = []
+    try:
+        get_templates(cad_file_path, TEMPLATE_MM_PER_PX)
+    except Exception as e:
+        warnings.append(f"Template rendering failed: {str(e)}")
+    try:
+        preview_file(cad_file_path)
+    except Exception as e:
+        warnings.append(f"Preview rendering failed: {str(e)}")
+
+    status.update(status="ready", message="CAD file ready for inspection", updated=time.time())
+    if warnings:
+        status["warning"] = "; ".join(warnings)
+
 def get_live_measurement() -> Optional[str]:
     """Read current measurement from live file"""
     live_file = BASE_DIR / "current_measurement.txt"
@@ -77,9 +149,16 @@ def get_live_measurement() -> Optional[str]:
         return live_file.read_text()
     return None
 
+def latest_report_file() -> Path:
+    """Per-part verdicts when the comparison produced them, else per-frame rows"""
+    part_report = BASE_DIR / "component_part_report.csv"
+    if part_report.exists():
+        return part_report
+    return BASE_DIR / "component_comparison_report.csv"
+
 def get_comparison_report() -> Optional[Dict]:
     """Load comparison report"""
-    report_file = BASE_DIR / "component_comparison_report.csv"
+    report_file = latest_report_file()
     if not report_file.exists():
         return None
     
@@ -100,13 +179,14 @@ def run_inspection_pipeline(cad_file_path: str, inspection_id: str):
             "message": "Extracting CAD dimensions..."
         }
         
-        # Step 1: Extract CAD dimensions
+        # Step 1: Extract CAD dimensions (served from the cache once the
+        # upload's pre-extraction has parsed it; templates may still render)
+        extracted = cad_file_extracted.get(Path(cad_file_path).name)
+        if extracted is not None:
+            extracted.wait(timeout=PRECOMPUTE_WAIT_S)
+
         if cad_file_path.lower().endswith(".dxf"):
-            subprocess.run(
-                ["python", str(BASE_DIR / "cad" / "cad_extractor.py"), cad_file_path],
-                check=True,
-                cwd=str(BASE_DIR)
-            )
+            cad = extract_cad_dimensions(cad_file_path)
         else:
             raise ValueError("Only DXF files supported")
         
@@ -114,35 +194,15 @@ def run_inspection_pipeline(cad_file_path: str, inspection_id: str):
         inspection_status[inspection_id]["message"] = "Identifying component type..."
         
         # Step 2: Identify component type
-        cad_output = BASE_DIR / "dxf_measurements.csv"
-        if not cad_output.exists():
-            raise FileNotFoundError("CAD extraction failed")
-        
-        cad_df = pd.read_csv(cad_output)
-        types = cad_df["type"].astype(str).str.lower().tolist()
-        
-        if "outer_diameter" in types and "inner_diameter" in types:
-            part = "bearing"
-        elif "outer_width" in types and "inner_diameter" in types:
-            part = "square_washer"
-        elif "across_flats" in types:
-            part = "hex_nut"
-        else:
-            part = "washer"
+        part = cad.component_type
         
         inspection_status[inspection_id]["step"] = "camera_inspection"
         inspection_status[inspection_id]["message"] = "Starting camera inspection..."
         inspection_status[inspection_id]["component_type"] = part
         
         # Step 3: Run vision script
-        vision_scripts = {
-            "bearing": BASE_DIR / "vision" / "bearing.py",
-            "washer": BASE_DIR / "vision" / "washer.py",
-            "square_washer": BASE_DIR / "vision" / "square_washer.py",
-            "hex_nut": BASE_DIR / "vision" / "nut.py"
-        }
-        
-        script_path = vision_scripts.get(part)
+        script = VISION_SCRIPTS.get(part)
+        script_path = BASE_DIR / script if script else None
         if not script_path or not script_path.exists():
             raise FileNotFoundError(f"Vision script not found for {part}")
         
@@ -177,7 +237,8 @@ def run_inspection_pipeline(cad_file_path: str, inspection_id: str):
         
         # Step 4: Compare results
         subprocess.run(
-            ["python", str(BASE_DIR / "comparison" / "compare_results.py")],
+            ["python", str(BASE_DIR / "comparison" / "compare_results.py"),
+             "--incremental", "--close-parts"],
             check=True,
             cwd=str(BASE_DIR)
         )
@@ -208,6 +269,13 @@ def run_inspection_pipeline(cad_file_path: str, inspection_id: str):
         if inspection_id in active_inspections:
             del active_inspections[inspection_id]
 
+@app.on_event("startup")
+def load_cad_catalog():
+    """Load the pre-built part catalog (python cad/cad_catalog.py)"""
+    global cad_catalog, part_index
+    cad_catalog = load_catalog()
+    part_index = PartIndex(cad_catalog)
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -218,7 +286,7 @@ async def health():
     return {"status": "healthy"}
 
 @app.post("/api/upload-cad")
-async def upload_cad_file(file: UploadFile = File(...)):
+async def upload_cad_file(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """Upload CAD file (DXF)"""
     if not file.filename.lower().endswith(".dxf"):
         raise HTTPException(status_code=400, detail="Only DXF files are supported")
@@ -229,13 +297,34 @@ async def upload_cad_file(file: UploadFile = File(...)):
         content = await file.read()
         f.write(content)
     
+    # Warm the CAD cache and templates before the operator starts inspecting
+    status = {
+        "status": "queued",
+        "message": "Waiting for pre-extraction...",
+        "path": str(file_path),
+        "updated": time.time()
+    }
+    extracted = threading.Event()
+    cad_file_status[file.filename] = status
+    cad_file_extracted[file.filename] = extracted
+    background_tasks.add_task(precompute_cad, str(file_path), status, extracted)
+    
     return {
         "success": True,
         "filename": file.filename,
         "path": str(file_path),
-        "size": len(content)
+        "size": len(content),
+        "status": "queued"
     }
 
+@app.get("/api/cad-status/{filename}")
+async def get_cad_status(filename: str):
+    """Get pre-extraction status of an uploaded CAD file"""
+    if filename not in cad_file_status:
+        raise HTTPException(status_code=404, detail="CAD file not uploaded")
+    
+    return cad_file_status[filename]
+
 @app.post("/api/start-inspection")
 async def start_inspection(request: InspectionRequest, background_tasks: BackgroundTasks):
     """Start inspection process"""
@@ -271,6 +360,20 @@ async def get_inspection_status(inspection_id: str):
     
     return status
 
+@app.get("/api/cad-preview/{filename}")
+async def get_cad_preview(filename: str, size: int = 512, fmt: str = "png"):
+    """Rendered PNG/SVG preview of an uploaded CAD file (cached by content)"""
+    cad_file_path = CAD_INPUT_DIR / Path(filename).name
+    if not cad_file_path.exists():
+        raise HTTPException(status_code=404, detail="CAD file not found")
+    
+    try:
+        path = await run_in_threadpool(preview_file, str(cad_file_path), size, fmt)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return FileResponse(path, media_type=PREVIEW_FORMATS[fmt])
+
 @app.get("/api/live-measurement")
 async def get_live_measurement_endpoint():
     """Get current live measurement"""
@@ -292,17 +395,20 @@ async def extract_cad_endpoint(request: ExtractCADRequest):
         raise HTTPException(status_code=404, detail="CAD file not found")
     
     # Run CAD extraction
-    if cad_file_path.lower().endswith(".dxf"):
-        subprocess.run(
-            ["python", str(BASE_DIR / "cad" / "cad_extractor.py"), cad_file_path],
-            check=True,
-            cwd=str(BASE_DIR)
-        )
-    else:
+    if not cad_file_path.lower().endswith(".dxf"):
         raise HTTPException(status_code=400, detail="Only DXF files supported")
     
-    dimensions = get_cad_dimensions()
-    return {"dimensions": dimensions, "success": True}
+    try:
+        cad = await run_in_threadpool(extract_cad_dimensions, cad_file_path)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return {
+        "dimensions": cad.dimensions,
+        "part": cad.part,
+        "component_type": cad.component_type,
+        "success": True
+    }
 
 @app.get("/api/cad-dimensions")
 async def get_cad_dimensions_endpoint():
@@ -310,6 +416,25 @@ async def get_cad_dimensions_endpoint():
     dimensions = get_cad_dimensions()
     return {"dimensions": dimensions}
 
+@app.get("/api/cad-catalog")
+async def get_cad_catalog():
+    """Get the pre-indexed CAD part library"""
+    if cad_catalog is None:
+        return {"parts": []}
+    
+    df = cad_catalog.drop(columns=["path"])
+    return {"parts": json.loads(df.to_json(orient="records"))}
+
+@app.post("/api/identify-part")
+async def identify_part(request: IdentifyPartRequest):
+    """Nearest library parts for measured dimensions (mm)"""
+    if part_index is None or not len(part_index):
+        raise HTTPException(status_code=404, detail="No CAD catalog loaded")
+    
+    matches = part_index.query(request.measurements, k=request.k,
+                               max_distance=request.max_distance_mm)
+    return {"matches": matches}
+
 @app.get("/api/comparison-report")
 async def get_comparison_report_endpoint():
     """Get latest comparison report"""
@@ -321,8 +446,8 @@ async def get_comparison_report_endpoint():
 
 @app.get("/api/dashboard-stats")
 async def get_dashboard_stats():
-    """Get dashboard statistics"""
-    report_file = BASE_DIR / "component_comparison_report.csv"
+    """Get dashboard statistics (one inspection per part when available)"""
+    report_file = latest_report_file()
     
     if not report_file.exists():
         return {
@@ -354,7 +479,7 @@ async def get_dashboard_stats():
 @app.get("/api/recent-inspections")
 async def get_recent_inspections(limit: int = 10):
     """Get recent inspection results"""
-    report_file = BASE_DIR / "component_comparison_report.csv"
+    report_file = latest_report_file()
     
     if not report_file.exists():
         return {"inspections": []}
@@ -366,6 +491,8 @@ async def get_recent_inspections(limit: int = 10):
     for _, row in df.iterrows():
         inspections.append({
             "timestamp": row.get("timestamp", 0),
+            "part_id": row.get("part_id"),
+            "frames": row.get("frames", 1),
             "status": row.get("status", "UNKNOWN"),
             "measurements": {k: v for k, v in row.items() if k.startswith("MEAS_")},
             "errors": {k: v for k, v in row.items() if k.endswith("_abs_err")}
@@ -0,0 +1,211 @@
+"""
+parse_dxf benchmark: real drawings + synthetic 10k / 100k / 1M entity files.
+
+USAGE:
+  python benchmarks/bench_parse_dxf.py
+  python benchmarks/bench_parse_dxf.py --sizes 10000 100000 --repeat 5
+  python benchmarks/bench_parse_dxf.py --baseline bench_results/<old>.json
+  python benchmarks/bench_parse_dxf.py --workers 4     # chunk-parallel parsing
+
+peak_mb is the parent's Python allocations (tracemalloc). With --workers > 1
+the workers are not traced: worker_peak_rss_mb is the largest worker RSS
+seen so far in the run (the OS only reports a lifetime maximum), None
+where the platform has no `resource` module (Windows).
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource                     # Unix only
+except ImportError:
+    resource = None
+
+CAMERA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(CAMERA_DIR, "cad"))
+
+from cad_extractor import (EXTRACTOR_VERSION, parse_dxf, dxf_section_index,
+                           _cached_section_index, shutdown_entity_pool)
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+REAL_DIRS = [os.path.join(CAMERA_DIR, "Dxf"), os.path.join(CAMERA_DIR, "cad_inputs")]
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+RESULTS_DIR = os.path.join(CAMERA_DIR, "bench_results")
+
+# ==========================================================
+# SYNTHETIC DRAWINGS
+# ==========================================================
+def _circle(f, x, y, r):
+    f.write(f"  0\nCIRCLE\n  8\n0\n 10\n{x:.6f}\n 20\n{y:.6f}\n 30\n0.0\n 40\n{r:.6f}\n")
+
+def _line(f, x1, y1, x2, y2):
+    f.write(f"  0\nLINE\n  8\n0\n 10\n{x1:.6f}\n 20\n{y1:.6f}\n 30\n0.0\n"
+            f" 11\n{x2:.6f}\n 21\n{y2:.6f}\n 31\n0.0\n")
+
+def _arc(f, x, y, r, a0, a1):
+    f.write(f"  0\nARC\n  8\n0\n 10\n{x:.6f}\n 20\n{y:.6f}\n 30\n0.0\n 40\n{r:.6f}\n"
+            f" 50\n{a0:.3f}\n 51\n{a1:.3f}\n")
+
+def _lwpolyline(f, pts, closed=True):
+    f.write(f"  0\nLWPOLYLINE\n  8\n0\n 90\n{len(pts)}\n 70\n{1 if closed else 0}\n")
+    for x, y in pts:
+        f.write(f" 10\n{x:.6f}\n 20\n{y:.6f}\n")
+
+def write_synthetic_dxf(path, n_entities, seed=0):
+    """Mixed CIRCLE / LINE / ARC / LWPOLYLINE drawing with n_entities records."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("  0\nSECTION\n  2\nHEADER\n  9\n$INSUNITS\n 70\n4\n  0\nENDSEC\n")
+        f.write("  0\nSECTION\n  2\nENTITIES\n")
+        for i in range(n_entities):
+            x, y = rng.uniform(-500, 500), rng.uniform(-500, 500)
+            kind = i % 4
+            if kind == 0:
+                _circle(f, x, y, rng.uniform(1, 20))
+            elif kind == 1:
+                _line(f, x, y, x + rng.uniform(-10, 10), y + rng.uniform(-10, 10))
+            elif kind == 2:
+                _arc(f, x, y, rng.uniform(1, 20), rng.uniform(0, 180), rng.uniform(180, 360))
+            else:
+                s = rng.uniform(1, 10)
+                _lwpolyline(f, [(x + s * math.cos(a), y + s * math.sin(a))
+                                for a in (0, 1.05, 2.1, 3.14, 4.19, 5.24)])
+        f.write("  0\nENDSEC\n  0\nEOF\n")
+
+# ==========================================================
+# MEASUREMENT
+# ==========================================================
+def count_entities(path):
+    return sum(1 for code, value in dxf_section_index(path).iter_section("ENTITIES")
+               if code == 0 and value not in ("ENDSEC", "SEQEND", "VERTEX"))
+
+def _children_peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # bytes on macOS, kilobytes on Linux / BSD
+    return rss / 1e6 if sys.platform == "darwin" else rss * 1024 / 1e6
+
+def _cold_parse(path, workers):
+    # drop memoized section indexes so every run pays the full parse
+    _cached_section_index.cache_clear()
+    t0 = time.perf_counter()
+    parse_dxf(path, workers)
+    return time.perf_counter() - t0
+
+def bench_file(name, path, repeat, workers=1):
+    entities = count_entities(path)
+
+    if workers != 1:
+        _cold_parse(path, workers)      # start the worker pool outside the timings
+    times = [_cold_parse(path, workers) for _ in range(repeat)]
+    best = min(times)
+
+    tracemalloc.start()
+    _cold_parse(path, workers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # reaped workers report their peak RSS (small files never start them)
+    worker_rss = None
+    if shutdown_entity_pool():
+        worker_rss = _children_peak_rss_mb()
+
+    return {
+        "name": name,
+        "bytes": os.path.getsize(path),
+        "entities": entities,
+        "workers": workers,
+        "parse_s": best,
+        "parse_s_median": sorted(times)[len(times) // 2],
+        "peak_mb": peak / 1e6,
+        "worker_peak_rss_mb": worker_rss,
+        "entities_per_s": entities / best if best > 0 else 0.0,
+    }
+
+def real_files():
+    files = []
+    for d in REAL_DIRS:
+        files.extend(p for p in glob.glob(os.path.join(d, "*")) if p.lower().endswith(".dxf"))
+    return sorted(files)
+
+# ==========================================================
+# REPORT
+# ==========================================================
+def print_table(results, baseline=None):
+    base = {r["name"]: r for r in (baseline or {}).get("results", [])}
+
+    print(f"\n{'file':<48} {'entities':>9} {'parse ms':>10} {'peak MB':>8} {'worker MB':>10} "
+          f"{'ent/s':>11}  vs base")
+    for r in results:
+        ratio = ""
+        if r["name"] in base and base[r["name"]]["parse_s"] > 0:
+            ratio = f"x{r['parse_s'] / base[r['name']]['parse_s']:.2f}"
+        rss = r.get("worker_peak_rss_mb")
+        rss = f"{rss:>10.1f}" if rss is not None else f"{'-':>10}"
+        print(f"{r['name'][:48]:<48} {r['entities']:>9} {r['parse_s'] * 1000:>10.2f} "
+              f"{r['peak_mb']:>8.2f} {rss} {r['entities_per_s']:>11.0f}  {ratio}")
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark parse_dxf")
+    parser.add_argument("--sizes", type=int, nargs="*", default=DEFAULT_SIZES,
+                        help="synthetic drawing sizes in entities")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="parse_dxf workers (1 = serial, 0 = one per CPU)")
+    parser.add_argument("--no-real", action="store_true", help="skip camera/Dxf + cad_inputs")
+    parser.add_argument("-o", "--output", default=None, help="results JSON path")
+    parser.add_argument("--baseline", default=None, help="previous results JSON to compare")
+    args = parser.parse_args()
+
+    results = []
+
+    if not args.no_real:
+        for path in real_files():
+            rel = os.path.relpath(path, CAMERA_DIR).replace(os.sep, "/")
+            results.append(bench_file(rel, path, args.repeat, args.workers))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in args.sizes:
+            path = os.path.join(tmp, f"synthetic_{n}.dxf")
+            write_synthetic_dxf(path, n)
+            results.append(bench_file(f"synthetic/{n}", path, args.repeat, args.workers))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    print_table(results, baseline)
+
+    report = {
+        "extractor_version": EXTRACTOR_VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeat": args.repeat,
+        "workers": args.workers,
+        "results": results,
+    }
+
+    out = args.output
+    if out is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        out = os.path.join(RESULTS_DIR, f"parse_dxf_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"\nResults saved to {out}\n")
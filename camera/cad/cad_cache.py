@@ -0,0 +1,177 @@
+import hashlib
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+
+from cad_extractor import EXTRACTOR_VERSION, extract_geometry
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+CACHE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cad_cache"
+)
+
+MAX_ENTRIES = 512
+MAX_BYTES = 64 * 1024 * 1024
+
+_HASH_CHUNK = 1024 * 1024
+
+# ==========================================================
+# CONTENT HASH
+# ==========================================================
+@lru_cache(maxsize=1024)
+def _digest(path, mtime_ns, size):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def file_digest(path):
+    """sha256 of the file contents, memoized per (path, mtime, size)."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return _digest(path, st.st_mtime_ns, st.st_size)
+
+# ==========================================================
+# ON-DISK CACHE (npz per part, LRU by file mtime)
+# ==========================================================
+class CadCache:
+    """
+    Parsed CAD geometry keyed by content hash + extractor version.
+    Each entry is one compressed .npz holding the circle table, the
+    outline points, the derived dimensions and the loop statistics. Hits refresh the entry's
+    mtime; the oldest entries are evicted beyond max_entries / max_bytes.
+    """
+
+    suffix = ".npz"
+
+    def __init__(self, root=CACHE_DIR, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.root = root
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(self.root, exist_ok=True)
+
+    def key(self, path, simplify_tol=None):
+        key = f"{file_digest(path)}-v{EXTRACTOR_VERSION}"
+        if simplify_tol is not None:
+            key += f"-s{simplify_tol:g}"
+        return key
+
+    def _entry_path(self, key):
+        return os.path.join(self.root, key + self.suffix)
+
+    def _publish(self, key, write):
+        """
+        write(f) the entry into a private temp file, then move it into place.
+        Concurrent writers (threads or processes) of the same key never share
+        a temp file; if ours cannot be moved but theirs landed, that entry
+        serves just as well.
+        """
+        entry_path = self._entry_path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=key + ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                write(f)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            if not os.path.exists(entry_path):
+                raise
+        return entry_path
+
+    def get(self, key):
+        """Cached entry dict, or None on a miss / unreadable entry."""
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as z:
+                circ = z["circles"]
+                outer = z["outer_points"]
+                meta = json.loads(str(z["meta"]))
+        except (OSError, KeyError, ValueError):
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        circles = [{"r": r, "d": 2 * r, "cx": cx, "cy": cy}
+                   for r, cx, cy in circ.tolist()]
+        return {
+            "circles": circles,
+            "outer_points": [tuple(p) for p in outer.tolist()],
+            "part": meta["part"],
+            "dimensions": [tuple(r) for r in meta["dimensions"]],
+            "loops": meta.get("loops", []),
+            "simplify": meta.get("simplify"),
+            "fingerprint": meta.get("fingerprint"),
+            "error": meta.get("error"),
+        }
+
+    def put(self, key, entry):
+        circ = np.array([(c["r"], c["cx"], c["cy"]) for c in entry["circles"]],
+                        dtype=np.float64).reshape(-1, 3)
+        outer = np.asarray(entry["outer_points"], dtype=np.float64).reshape(-1, 2)
+        meta = json.dumps({k: entry.get(k) for k in ("part", "dimensions", "loops",
+                                                    "simplify", "fingerprint", "error")})
+
+        self._publish(key, lambda f: np.savez_compressed(
+            f, circles=circ, outer_points=outer, meta=np.array(meta)))
+
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith(self.suffix):
+                continue
+            p = os.path.join(self.root, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+
+        entries.sort()
+        total = sum(e[1] for e in entries)
+        while entries and (len(entries) > self.max_entries or total > self.max_bytes):
+            _, size, p = entries.pop(0)
+            try:
+                os.remove(p)
+            except OSError:
+                pass
+            total -= size
+
+_default_cache = None
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = CadCache()
+    return _default_cache
+
+# ==========================================================
+# CACHED EXTRACTION
+# ==========================================================
+def extract_cached(path, cache=None, simplify_tol=None):
+    """
+    extract_geometry(), served from the cache when the same file content
+    was already extracted by this extractor version (and tolerance).
+    """
+    cache = cache or default_cache()
+    key = cache.key(path, simplify_tol)
+
+    entry = cache.get(key)
+    if entry is None:
+        entry = extract_geometry(path, simplify_tol)
+        cache.put(key, entry)
+
+    return entry
@@ -0,0 +1,171 @@
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cad_extractor import dxf_section_index
+from cad_cache import extract_cached, file_digest
+from fingerprint import FINGERPRINT_FIELDS, hole_circles, recipe_for_part
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+CAMERA_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_DIRS = [
+    os.path.join(CAMERA_DIR, "cad_inputs"),
+    os.path.join(CAMERA_DIR, "Dxf"),
+]
+CATALOG_FILE = os.path.join(CAMERA_DIR, "cad_catalog.npz")
+
+DIMENSION_COLUMNS = [
+    "outer_diameter",
+    "inner_diameter",
+    "outer_width",
+    "outer_height",
+    "across_flats",
+]
+
+# ==========================================================
+# DIRECTORY WALK
+# ==========================================================
+def find_dxf_files(dirs):
+    files = []
+    for root_dir in dirs:
+        for root, _, names in os.walk(root_dir):
+            for name in names:
+                if name.lower().endswith(".dxf"):
+                    files.append(os.path.join(root, name))
+    return sorted(files)
+
+# ==========================================================
+# ONE CATALOG ROW (runs in a worker process)
+# ==========================================================
+def part_id(path, base):
+    """Path below `base` without extension: same-named files in two folders stay distinct."""
+    return os.path.splitext(os.path.relpath(path, base))[0].replace(os.sep, "/")
+
+def catalog_row(path, base=None):
+    row = {
+        "part_id": part_id(path, base or os.path.dirname(path)),
+        "path": os.path.abspath(path),
+        "content_hash": "",
+        "insunits": -1,
+        "part": "",
+        "hole_count": 0,
+        "holes": "[]",
+        "loop_count": 0,
+        "hole_loop_count": 0,
+        "outer_area": np.nan,
+        "outer_perimeter": np.nan,
+        "recipe": "",
+        "error": "",
+    }
+    row.update({c: np.nan for c in DIMENSION_COLUMNS})
+    row.update({f"fp_{f}": np.nan for f in FINGERPRINT_FIELDS})
+
+    try:
+        row["content_hash"] = file_digest(path)
+
+        insunits = dxf_section_index(path).header_value("$INSUNITS")
+        try:
+            row["insunits"] = int(insunits)
+        except (TypeError, ValueError):
+            pass
+
+        entry = extract_cached(path)
+    except Exception as e:
+        row["error"] = str(e)
+        return row
+
+    fp = entry["fingerprint"]
+    outer_size = fp[FINGERPRINT_FIELDS.index("outer_size")]
+    holes = sorted(hole_circles(entry["circles"], outer_size), key=lambda c: c["r"], reverse=True)
+    row["holes"] = json.dumps([
+        [round(c["d"], 4), round(c["cx"], 4), round(c["cy"], 4)] for c in holes
+    ])
+    row["hole_count"] = len(holes)
+
+    loops = entry["loops"]
+    row["loop_count"] = len(loops)
+    row["hole_loop_count"] = sum(1 for l in loops if l["role"] == "hole")
+    outer = next((l for l in loops if l["role"] == "outer"), None)
+    if outer is not None:
+        row["outer_area"] = outer["area"]
+        row["outer_perimeter"] = outer["perimeter"]
+
+    row["part"] = entry["part"] or ""
+    row.update({f"fp_{f}": float(v) for f, v in zip(FINGERPRINT_FIELDS, fp)})
+    if entry["part"]:
+        row["recipe"] = recipe_for_part(fp, (t for t, _ in entry["dimensions"]))
+    row["error"] = entry["error"] or ""
+    for dim_type, value in entry["dimensions"]:
+        if dim_type in row:
+            row[dim_type] = float(value)
+
+    return row
+
+# ==========================================================
+# CATALOG BUILD / LOAD
+# ==========================================================
+def build_catalog(dirs=None, out_path=CATALOG_FILE, workers=None):
+    """
+    Extract every DXF under `dirs` in a process pool, save one catalog.
+    part_id is the path below the folder holding the scanned dirs
+    (e.g. cad_inputs/washer), so it stays unique across them.
+    """
+    dirs = dirs or DEFAULT_DIRS
+    files = find_dxf_files(dirs)
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(d)) for d in dirs])
+    bases = [base] * len(files)
+
+    if workers == 1 or len(files) < 2:
+        rows = [catalog_row(f, base) for f in files]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(catalog_row, files, bases, chunksize=4))
+
+    df = pd.DataFrame(rows)
+    save_catalog(df, out_path)
+    return df
+
+def save_catalog(df, path=CATALOG_FILE):
+    """One array per column in a compressed .npz (no pickled objects)."""
+    columns = {}
+    for col in df.columns:
+        values = df[col].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        columns[col] = values
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(f, __columns__=np.array(list(df.columns)), **columns)
+    os.replace(tmp_path, path)
+
+def load_catalog(path=CATALOG_FILE):
+    """Catalog DataFrame, or None when no catalog has been built yet."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path, allow_pickle=False) as z:
+        order = [str(c) for c in z["__columns__"]]
+        return pd.DataFrame({c: z[c] for c in order}, columns=order)
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the CAD part catalog")
+    parser.add_argument("dirs", nargs="*", help="directories to scan (default: cad_inputs, Dxf)")
+    parser.add_argument("-o", "--output", default=CATALOG_FILE)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    catalog = build_catalog(args.dirs or None, args.output, args.workers)
+
+    failed = (catalog["error"] != "").sum() if len(catalog) else 0
+    print(f"\nCataloged {len(catalog)} DXF files ({failed} without dimensions)")
+    print(f"Saved as {args.output}\n")
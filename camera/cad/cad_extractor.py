@@ -1,7 +1,19 @@
 import csv
 import math
+import mmap
+import re
+import struct
 import sys
 import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from fingerprint import fingerprint, fingerprint_dict, recipe_for_dimensions, recipe_for_part
+from simplify import SIMPLIFY_TOL_MM, simplify_geometry
+from topology import build_topology, loop_circles, loop_summary
 
 # ==========================================================
 # DXF UNITS → MM
@@ -16,87 +28,986 @@ INSUNITS_TO_MM = {
 }
 
 # ==========================================================
-# BASIC DXF HELPERS
+# STREAMING DXF TOKENIZER
 # ==========================================================
-def load_dxf(path):
-    with open(path, "r", errors="ignore") as f:
-        return [l.rstrip() for l in f]
+def iter_dxf_pairs(lines):
+    """Yield (group_code, value) pairs from any iterable of DXF lines."""
+    it = iter(lines)
+    for code in it:
+        value = next(it, None)
+        if value is None:
+            return
+        try:
+            code = int(code)
+        except ValueError:
+            continue
+        yield code, value.strip()
+
+def _append_value(data, etype, code, value):
+    values = data.setdefault(code, [])
+    if code == 42 and etype == "LWPOLYLINE":
+        # bulges are optional per vertex; keep them index-aligned
+        values.extend(["0"] * (len(data.get(10, ())) - 1 - len(values)))
+    values.append(value)
+
+def iter_dxf_entities(pairs, header_vars=None, entity_types=None, section=None):
+    """
+    Single pass over the group-code stream.
+    Yields (entity_type, {code: [values]}) for every ENTITIES record and
+    fills `header_vars` with the HEADER variables it was seeded with.
+    Everything else (TABLES, BLOCKS, OBJECTS ...) is skipped on the fly.
+
+    entity_types : only build records for these types (None = all)
+    section      : section the stream starts in (for pre-sliced input)
+    """
+    if header_vars is None:
+        header_vars = {}
+
+    want_section_name = False
+    header_var = None
+    etype = None
+    data = None
+
+    for code, value in pairs:
+        if code == 0:
+            if etype is not None:
+                yield etype, data
+                etype = None
+
+            if value == "SECTION":
+                want_section_name = True
+            elif value == "ENDSEC":
+                section = None
+            elif section == "ENTITIES":
+                etype = value.upper()
+                if entity_types is not None and etype not in entity_types:
+                    etype = None
+                else:
+                    data = {}
+            continue
+
+        if want_section_name:
+            if code == 2:
+                section = value
+                want_section_name = False
+            continue
+
+        if etype is not None:
+            _append_value(data, etype, code, value)
+
+        elif section == "HEADER":
+            if code == 9:
+                header_var = value if value in header_vars else None
+            elif header_var is not None:
+                if header_vars[header_var] is None:
+                    header_vars[header_var] = value
+                header_var = None
 
-def dxf_pairs(lines):
-    i = 0
-    while i < len(lines) - 1:
-        yield lines[i].strip(), lines[i+1].strip()
-        i += 2
+    if etype is not None:
+        yield etype, data
 
 # ==========================================================
-# DXF PARSER (CIRCLE + LINE + POLYLINE)
+# BINARY DXF
 # ==========================================================
-def parse_dxf(path):
-    lines = load_dxf(path)
-    tokens = list(dxf_pairs(lines))
+BINARY_DXF_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
 
-    # ---------- Units ----------
-    insunits = None
-    for i in range(len(tokens)):
-        if tokens[i][1] == "$INSUNITS":
-            try:
-                insunits = int(tokens[i+1][1])
-            except:
-                pass
+_DOUBLE = struct.Struct("<d")
+_INT16 = struct.Struct("<h")
+_INT32 = struct.Struct("<i")
+_INT64 = struct.Struct("<q")
+_CODE16 = struct.Struct("<H")
+
+def _binary_value_kind(code):
+    if 10 <= code <= 59 or 110 <= code <= 149 or 210 <= code <= 239 \
+            or 460 <= code <= 469 or 1010 <= code <= 1059:
+        return "d"
+    if 60 <= code <= 79 or 170 <= code <= 179 or 270 <= code <= 289 \
+            or 370 <= code <= 389 or 400 <= code <= 409 or 1060 <= code <= 1070:
+        return "h"
+    if 90 <= code <= 99 or 420 <= code <= 429 or 440 <= code <= 459 \
+            or code == 1071:
+        return "l"
+    if 160 <= code <= 169:
+        return "q"
+    if 290 <= code <= 299:
+        return "b"
+    if 310 <= code <= 319 or code == 1004:
+        return "x"
+    return "s"
+
+_BINARY_KINDS = tuple(_binary_value_kind(c) for c in range(1072))
+
+def _binary_two_byte_codes(buf):
+    # R13+ writes group codes as int16; R12 uses one byte (255 = escape).
+    # The first pair is always (0, "SECTION"), so the second byte decides.
+    pos = len(BINARY_DXF_SENTINEL)
+    return len(buf) > pos + 1 and buf[pos + 1] == 0
+
+def _iter_binary_pairs_at(buf, pos, end, two_byte):
+    """Yield (offset, group_code, value) with values already typed."""
+    while pos < end:
+        start = pos
+        if two_byte:
+            code = _CODE16.unpack_from(buf, pos)[0]
+            pos += 2
+        else:
+            code = buf[pos]
+            pos += 1
+            if code == 255:
+                code = _CODE16.unpack_from(buf, pos)[0]
+                pos += 2
+
+        kind = _BINARY_KINDS[code] if code < len(_BINARY_KINDS) else "s"
+        if kind == "d":
+            value = _DOUBLE.unpack_from(buf, pos)[0]
+            pos += 8
+        elif kind == "h":
+            value = _INT16.unpack_from(buf, pos)[0]
+            pos += 2
+        elif kind == "l":
+            value = _INT32.unpack_from(buf, pos)[0]
+            pos += 4
+        elif kind == "q":
+            value = _INT64.unpack_from(buf, pos)[0]
+            pos += 8
+        elif kind == "b":
+            value = buf[pos]
+            pos += 1
+        elif kind == "x":
+            n = buf[pos]
+            value = bytes(buf[pos + 1:pos + 1 + n])
+            pos += 1 + n
+        else:
+            nul = buf.find(b"\x00", pos, end)
+            if nul < 0:
+                nul = end
+            value = bytes(buf[pos:nul]).decode("utf-8", "ignore").strip()
+            pos = nul + 1
+
+        yield start, code, value
+
+def iter_binary_dxf_pairs(buf, start=None, end=None):
+    """(group_code, value) pairs of a binary DXF buffer."""
+    two_byte = _binary_two_byte_codes(buf)
+    if start is None:
+        start = len(BINARY_DXF_SENTINEL)
+    if end is None:
+        end = len(buf)
+    for _, code, value in _iter_binary_pairs_at(buf, start, end, two_byte):
+        yield code, value
+
+# ==========================================================
+# MEMORY-MAPPED SECTION INDEX
+# ==========================================================
+_SECTION_RE = re.compile(rb"^[ \t]*0\r?\n(SECTION|ENDSEC)\r?$", re.M)
+_SECTION_NAME_RE = re.compile(rb"\r?\n[ \t]*2\r?\n([^\r\n]*)\r?\n")
+_HEADER_VAR_RE = re.compile(rb"^[ \t]*9\r?\n(\$[^\r\n]*?)\r?\n", re.M)
+
+def _iter_mmap_lines(mm, start, end):
+    mm.seek(start)
+    while mm.tell() < end:
+        line = mm.readline()
+        if not line:
+            return
+        yield line.decode("utf-8", "ignore")
+
+# a group-code-0 line followed by a line holding a letter is always a record
+# start (codes are numeric, so a value "0" can never be followed by one)
+_RECORD_START_RE = re.compile(rb"^[ \t]*0\r?\n([^\r\n]*[A-Za-z][^\r\n]*)\r?$", re.M)
+
+def iter_filtered_records(mm, start, end, entity_codes):
+    """
+    Filter pushdown for ASCII DXF: yields (entity_type, {code: [values]})
+    only for the types in `entity_codes`, keeping only their listed group
+    codes. Other records are jumped over with one regex search and
+    unlisted values are never decoded.
+    """
+    wanted = {t.encode(): (t, frozenset(codes)) for t, codes in entity_codes.items()}
+
+    m = _RECORD_START_RE.search(mm, start, end)
+    while m is not None:
+        nxt = _RECORD_START_RE.search(mm, m.end(), end)
+        rec_end = nxt.start() if nxt is not None else end
+
+        spec = wanted.get(m.group(1).strip().upper())
+        if spec is not None:
+            etype, codes = spec
+            data = {}
+            p = mm.find(b"\n", m.end(), rec_end) + 1
+            while 0 < p < rec_end:
+                nl = mm.find(b"\n", p, rec_end)
+                if nl < 0:
+                    break
+                ve = mm.find(b"\n", nl + 1, rec_end)
+                if ve < 0:
+                    ve = rec_end
+                try:
+                    code = int(mm[p:nl])
+                except ValueError:
+                    code = None
+                if code in codes:
+                    value = mm[nl + 1:ve].decode("utf-8", "ignore").strip()
+                    _append_value(data, etype, code, value)
+                p = ve + 1
+            yield etype, data
+
+        m = nxt
+
+class DxfSectionIndex:
+    """
+    Byte offsets of every SECTION body and HEADER variable of a DXF file
+    (ASCII or binary). Built once per file version; lookups then seek
+    straight to the bytes they need instead of scanning from the start.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.binary = False
+        self.sections = {}      # name -> (body_start, body_end)
+        self.header_vars = {}   # $NAME -> offset of the value pair
+
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.binary = mm[:len(BINARY_DXF_SENTINEL)] == BINARY_DXF_SENTINEL
+                if self.binary:
+                    self._build_binary(mm)
+                else:
+                    self._build(mm)
+
+    def _build(self, mm):
+        name = None
+        start = None
+        for m in _SECTION_RE.finditer(mm):
+            if m.group(1) == b"SECTION":
+                nm = _SECTION_NAME_RE.match(mm, m.end())
+                if nm is None:
+                    continue
+                name = nm.group(1).strip().decode("utf-8", "ignore")
+                start = nm.end()
+            elif name is not None:
+                self.sections.setdefault(name, (start, m.start()))
+                name = None
+
+        # unterminated last section (hand-written files ending in EOF)
+        if name is not None:
+            self.sections.setdefault(name, (start, len(mm)))
+
+        if "HEADER" in self.sections:
+            start, end = self.sections["HEADER"]
+            for m in _HEADER_VAR_RE.finditer(mm, start, end):
+                var = m.group(1).decode("utf-8", "ignore")
+                self.header_vars.setdefault(var, m.end())
+
+    def _build_binary(self, mm):
+        # no line structure to search, so walk the pairs once
+        two_byte = _binary_two_byte_codes(mm)
+        pairs = _iter_binary_pairs_at(mm, len(BINARY_DXF_SENTINEL), len(mm), two_byte)
+        name = None
+        start = None
+        want_name = False
+        want_var = None
+        for offset, code, value in pairs:
+            if want_name:
+                want_name = False
+                if code == 2:
+                    name = value
+                    start = None
+                    continue
+            if name is not None and start is None:
+                start = offset
+            if want_var is not None:
+                self.header_vars.setdefault(want_var, offset)
+                want_var = None
+
+            if code == 0 and value == "SECTION":
+                want_name = True
+            elif code == 0 and value == "ENDSEC" and name is not None:
+                self.sections.setdefault(name, (start, offset))
+                name = None
+            elif code == 9 and name == "HEADER":
+                want_var = value
+
+        if name is not None:
+            self.sections.setdefault(name, (start if start is not None else len(mm), len(mm)))
+
+    def _pairs(self, mm, start, end):
+        if self.binary:
+            return iter_binary_dxf_pairs(mm, start, end)
+        return iter_dxf_pairs(_iter_mmap_lines(mm, start, end))
+
+    def header_value(self, name):
+        """Value of a HEADER variable (first group after it), or None."""
+        offset = self.header_vars.get(name)
+        if offset is None:
+            return None
+        with open(self.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for _, value in self._pairs(mm, offset, len(mm)):
+                return value
+        return None
+
+    def iter_section(self, name):
+        """(group_code, value) pairs of one section body."""
+        if name not in self.sections:
+            return
+        start, end = self.sections[name]
+        with open(self.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from self._pairs(mm, start, end)
+
+    def iter_records(self, entity_codes, section="ENTITIES", start=None, end=None):
+        """
+        Records of `section` restricted to entity_codes {type: {codes}};
+        unlisted types and group codes are skipped while tokenizing.
+        start/end narrow the byte range (ASCII only).
+        """
+        if section not in self.sections:
+            return
+        s_start, s_end = self.sections[section]
+        start = s_start if start is None else start
+        end = s_end if end is None else end
+
+        with open(self.path, "rb") as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if not self.binary:
+                yield from iter_filtered_records(mm, start, end, entity_codes)
+                return
+
+            records = iter_dxf_entities(self._pairs(mm, start, end),
+                                        entity_types=entity_codes,
+                                        section="ENTITIES")
+            for etype, data in records:
+                codes = entity_codes[etype]
+                yield etype, {c: v for c, v in data.items() if c in codes}
+
+@lru_cache(maxsize=256)
+def _cached_section_index(path, mtime_ns, size):
+    return DxfSectionIndex(path)
+
+def dxf_section_index(path):
+    """Section index for `path`, rebuilt only when the file changes."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return _cached_section_index(path, st.st_mtime_ns, st.st_size)
+
+# ==========================================================
+# CURVE TESSELLATION (vectorized over all curves at once)
+# ==========================================================
+ARC_MAX_STEP_DEG = 5.0          # max angular step between arc samples
+SPLINE_SAMPLES_PER_SPAN = 8     # samples per non-empty knot span
+
+def _ragged_params(starts, sweeps, max_step):
+    """
+    Sample parameters for many curves in one shot.
+    Returns (t, curve_idx, counts): flat parameter values, the curve
+    each sample belongs to and the samples per curve (endpoints included).
+    """
+    counts = np.maximum(np.ceil(np.abs(sweeps) / max_step), 1).astype(np.int64) + 1
+    curve_idx = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    k = np.arange(counts.sum()) - np.repeat(offsets, counts)
+    frac = k / np.repeat(counts - 1, counts)
+    t = starts[curve_idx] + frac * sweeps[curve_idx]
+    return t, curve_idx, counts
+
+def split_samples(points, counts):
+    """Split flat tessellation output back into one array per curve."""
+    return np.split(points, np.cumsum(counts)[:-1])
+
+def tessellate_arcs(arcs, with_counts=False):
+    """arcs: (N, 5) of cx, cy, r, start_deg, end_deg -> (M, 2) points."""
+    arcs = np.asarray(arcs, dtype=np.float64).reshape(-1, 5)
+    if not len(arcs):
+        empty = np.empty((0, 2))
+        return (empty, np.zeros(0, dtype=np.int64)) if with_counts else empty
+
+    start = np.radians(arcs[:, 3])
+    sweep = np.radians(np.mod(arcs[:, 4] - arcs[:, 3], 360.0))
+    sweep[sweep == 0] = 2 * np.pi
+
+    t, i, counts = _ragged_params(start, sweep, np.radians(ARC_MAX_STEP_DEG))
+    r = arcs[i, 2]
+    pts = np.column_stack((arcs[i, 0] + r * np.cos(t), arcs[i, 1] + r * np.sin(t)))
+    return (pts, counts) if with_counts else pts
+
+def tessellate_ellipses(ellipses, with_counts=False):
+    """ellipses: (N, 7) of cx, cy, major_x, major_y, ratio, t0, t1 (rad)."""
+    el = np.asarray(ellipses, dtype=np.float64).reshape(-1, 7)
+    if not len(el):
+        empty = np.empty((0, 2))
+        return (empty, np.zeros(0, dtype=np.int64)) if with_counts else empty
+
+    sweep = np.mod(el[:, 6] - el[:, 5], 2 * np.pi)
+    sweep[np.isclose(sweep, 0)] = 2 * np.pi
+
+    t, i, counts = _ragged_params(el[:, 5], sweep, np.radians(ARC_MAX_STEP_DEG))
+    mx, my, ratio = el[i, 2], el[i, 3], el[i, 4]
+    c, s = np.cos(t), np.sin(t)
+    # minor axis = major axis rotated +90 deg, scaled by ratio
+    pts = np.column_stack((el[i, 0] + c * mx - s * ratio * my,
+                            el[i, 1] + c * my + s * ratio * mx))
+    return (pts, counts) if with_counts else pts
+
+def bulge_arcs(xs, ys, bulges, closed):
+    """Bulged LWPOLYLINE segments -> arc rows (cx, cy, r, start_deg, end_deg)."""
+    x0, y0 = xs, ys
+    x1, y1 = np.roll(xs, -1), np.roll(ys, -1)
+    b = bulges
+    if not closed:
+        x0, y0, x1, y1, b = x0[:-1], y0[:-1], x1[:-1], y1[:-1], b[:-1]
+
+    keep = b != 0
+    x0, y0, x1, y1, b = x0[keep], y0[keep], x1[keep], y1[keep], b[keep]
+    if not len(b):
+        return np.empty((0, 5))
+
+    # negative bulge = clockwise: same arc as the reversed segment
+    cw = b < 0
+    x0, x1 = np.where(cw, x1, x0), np.where(cw, x0, x1)
+    y0, y1 = np.where(cw, y1, y0), np.where(cw, y0, y1)
+    b = np.abs(b)
+
+    theta = 4 * np.arctan(b)
+    chord = np.hypot(x1 - x0, y1 - y0)
+    r = chord / (2 * np.sin(theta / 2))
+    # signed distance from chord midpoint to the centre
+    h = r * np.cos(theta / 2)
+    mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+    nx, ny = -(y1 - y0) / chord, (x1 - x0) / chord
+    cx, cy = mx + h * nx, my + h * ny
+
+    a0 = np.degrees(np.arctan2(y0 - cy, x0 - cx))
+    a1 = np.degrees(np.arctan2(y1 - cy, x1 - cx))
+    return np.column_stack((cx, cy, r, a0, a1))
+
+def evaluate_bspline(ctrl, knots, degree, weights=None):
+    """Sample a (rational) B-spline with Cox-de Boor evaluated over all samples."""
+    ctrl = np.asarray(ctrl, dtype=np.float64)
+    k = np.asarray(knots, dtype=np.float64)
+    n_ctrl = len(ctrl)
+    if n_ctrl <= degree or len(k) != n_ctrl + degree + 1:
+        return ctrl
+
+    t0, t1 = k[degree], k[n_ctrl]
+    spans = np.count_nonzero(np.diff(k[degree:n_ctrl + 1]) > 0)
+    t = np.linspace(t0, t1, max(spans, 1) * SPLINE_SAMPLES_PER_SPAN + 1)
+    t[-1] = np.nextafter(t1, t0)
+    tc = t[:, None]
+
+    N = ((k[:-1] <= tc) & (tc < k[1:])).astype(np.float64)
+    for p in range(1, degree + 1):
+        n = N.shape[1] - 1
+        d1 = k[p:p + n] - k[:n]
+        d2 = k[p + 1:p + 1 + n] - k[1:1 + n]
+        a = np.divide(tc - k[:n], d1, out=np.zeros((len(t), n)), where=d1 != 0)
+        b = np.divide(k[p + 1:p + 1 + n] - tc, d2, out=np.zeros((len(t), n)), where=d2 != 0)
+        N = a * N[:, :n] + b * N[:, 1:n + 1]
+
+    if weights is not None and len(weights) == n_ctrl:
+        N = N * np.asarray(weights, dtype=np.float64)
+    denom = N.sum(axis=1, keepdims=True)
+    denom[denom == 0] = 1.0
+    return (N @ ctrl) / denom
+
+# ==========================================================
+# GEOMETRY ACCUMULATORS (raw drawing units)
+# ==========================================================
+def _first(data, code, default=0):
+    return float(data.get(code, [default])[0])
+
+def _floats(data, code):
+    return np.array(data.get(code, ()), dtype=np.float64)
+
+class FloatBuffer:
+    """Append-only (N, width) array with amortized doubling growth."""
+
+    def __init__(self, width, capacity=256, dtype=np.float64):
+        self.width = width
+        self.size = 0
+        self._data = np.empty((capacity, width), dtype=dtype)
+
+    def _reserve(self, extra):
+        need = self.size + extra
+        if need > len(self._data):
+            grown = np.empty((max(need, 2 * len(self._data)), self.width),
+                             dtype=self._data.dtype)
+            grown[:self.size] = self._data[:self.size]
+            self._data = grown
+
+    def append(self, row):
+        self._reserve(1)
+        self._data[self.size] = row
+        self.size += 1
+
+    def extend(self, rows):
+        rows = np.asarray(rows, dtype=self._data.dtype).reshape(-1, self.width)
+        self._reserve(len(rows))
+        self._data[self.size:self.size + len(rows)] = rows
+        self.size += len(rows)
+
+    def array(self):
+        return self._data[:self.size]
+
+    def __len__(self):
+        return self.size
+
+class GeometryAccumulator:
+    """
+    Collects raw geometry while the entity stream is walked, straight into
+    growable float arrays (no per-point Python objects).
+    Curves are only recorded here; finish() tessellates each kind in a
+    single batch.
+    """
+
+    def __init__(self):
+        self.circles = FloatBuffer(3)       # r, cx, cy
+        self.arcs = FloatBuffer(5)          # cx, cy, r, start_deg, end_deg
+        self.ellipses = FloatBuffer(7)      # cx, cy, major_x, major_y, ratio, t0, t1
+        self.path_points = FloatBuffer(2)   # every path back to back (= outline points)
+        self.path_ends = FloatBuffer(1, dtype=np.int64)
+        self.path_closed = FloatBuffer(1, dtype=np.bool_)
+        self.inserts = []                   # (block_name, insert params) for expand_inserts
+        self._vertices = None               # open old-style POLYLINE
+
+    def add_path(self, pts, closed=False):
+        """One entity's polyline, for loop chaining and the outline points."""
+        self.path_points.extend(pts)
+        self.path_ends.append(len(self.path_points))
+        self.path_closed.append(closed)
+
+    def _add_sampled(self, pts, counts):
+        self.path_points.extend(pts)
+        self.path_ends.extend(len(self.path_points) - len(pts) + np.cumsum(counts))
+        self.path_closed.extend(np.zeros(len(counts), dtype=np.bool_))
+
+    def finish_arrays(self):
+        """
+        Returns (circles (N, 3), path_points (M, 2), path_ends (P,),
+        path_closed (P,)) as flat arrays; path_points doubles as the
+        outline point set.
+        """
+        if len(self.arcs):
+            self._add_sampled(*tessellate_arcs(self.arcs.array(), with_counts=True))
+            self.arcs = FloatBuffer(5)
+        if len(self.ellipses):
+            self._add_sampled(*tessellate_ellipses(self.ellipses.array(), with_counts=True))
+            self.ellipses = FloatBuffer(7)
+        return (self.circles.array(), self.path_points.array(),
+                self.path_ends.array().ravel(), self.path_closed.array().ravel())
+
+    def finish(self):
+        """Returns (circles (N, 3), outline points (M, 2), paths)."""
+        circles, path_pts, ends, closed = self.finish_arrays()
+        return circles, path_pts, paths_from_arrays(path_pts, ends, closed)
+
+def paths_from_arrays(path_pts, ends, closed):
+    """[(points view, closed), ...] from the flat path layout."""
+    return list(zip(np.split(path_pts, ends[:-1]), closed.tolist()))
+
+def add_circle(data, geom):
+    geom.circles.append((_first(data, 40), _first(data, 10), _first(data, 20)))
+
+def add_line(data, geom):
+    geom.add_path(((_first(data, 10), _first(data, 20)),
+                   (_first(data, 11), _first(data, 21))))
+
+def add_arc(data, geom):
+    geom.arcs.append((_first(data, 10), _first(data, 20), _first(data, 40),
+                      _first(data, 50), _first(data, 51, 360)))
+
+def add_ellipse(data, geom):
+    geom.ellipses.append((_first(data, 10), _first(data, 20),
+                          _first(data, 11), _first(data, 21), _first(data, 40, 1),
+                          _first(data, 41), _first(data, 42, 2 * math.pi)))
+
+def add_spline(data, geom):
+    ctrl = np.column_stack((_floats(data, 10), _floats(data, 20)))
+    if len(ctrl):
+        degree = int(_first(data, 71, 3))
+        weights = _floats(data, 41) if 41 in data else None
+        curve = evaluate_bspline(ctrl, _floats(data, 40), degree, weights)
+    else:
+        curve = np.column_stack((_floats(data, 11), _floats(data, 21)))
+    if len(curve):
+        geom.add_path(curve, bool(int(_first(data, 70)) & 1))
+
+def add_lwpolyline(data, geom):
+    xs = _floats(data, 10)
+    ys = _floats(data, 20)
+    n = min(len(xs), len(ys))
+    if not n:
+        return
+    xs, ys = xs[:n], ys[:n]
+    pts = np.column_stack((xs, ys))
+    closed = bool(int(_first(data, 70)) & 1)
+
+    if 42 not in data:
+        geom.add_path(pts, closed)
+        return
+
+    bulges = np.zeros(n)
+    b = _floats(data, 42)[:n]
+    bulges[:len(b)] = b
+    geom.arcs.extend(bulge_arcs(xs, ys, bulges, closed))
+
+    # straight spans become their own paths; arcs are added in finish()
+    straight = bulges == 0
+    if not closed:
+        straight[-1] = False
+    for k in np.flatnonzero(straight):
+        geom.add_path((pts[k], pts[(k + 1) % n]))
+
+def add_polyline(data, geom):
+    # old-style POLYLINE: the header point is a dummy, vertices follow
+    geom._vertices = []
+    geom._closed = bool(int(_first(data, 70)) & 1)
+
+def add_vertex(data, geom):
+    if geom._vertices is not None:
+        geom._vertices.append((_first(data, 10), _first(data, 20)))
+
+def end_sequence(data, geom):
+    if geom._vertices is not None:
+        if geom._vertices:
+            geom.add_path(geom._vertices, geom._closed)
+        geom._vertices = None
+
+def add_insert(data, geom):
+    geom.inserts.append((
+        data.get(2, [""])[0],
+        (_first(data, 10), _first(data, 20),
+         _first(data, 41, 1), _first(data, 42, 1), _first(data, 50),
+         int(_first(data, 70, 1)), int(_first(data, 71, 1)),
+         _first(data, 44), _first(data, 45)),
+    ))
+
+ENTITY_HANDLERS = {
+    "CIRCLE": add_circle,
+    "LINE": add_line,
+    "ARC": add_arc,
+    "ELLIPSE": add_ellipse,
+    "SPLINE": add_spline,
+    "LWPOLYLINE": add_lwpolyline,
+    "POLYLINE": add_polyline,
+    "VERTEX": add_vertex,
+    "SEQEND": end_sequence,
+    "INSERT": add_insert,
+}
+
+# group codes each handler reads; everything else is skipped while tokenizing
+ENTITY_CODES = {
+    "CIRCLE": {10, 20, 40},
+    "LINE": {10, 20, 11, 21},
+    "ARC": {10, 20, 40, 50, 51},
+    "ELLIPSE": {10, 20, 11, 21, 40, 41, 42},
+    "SPLINE": {10, 20, 11, 21, 40, 41, 70, 71},
+    "LWPOLYLINE": {10, 20, 42, 70},
+    "POLYLINE": {70},
+    "VERTEX": {10, 20},
+    "SEQEND": set(),
+    "INSERT": {2, 10, 20, 41, 42, 44, 45, 50, 70, 71},
+}
+
+# ==========================================================
+# BLOCKS + INSERT EXPANSION
+# ==========================================================
+MAX_BLOCK_DEPTH = 16
+
+class BlockLibrary:
+    """
+    Block definitions of one drawing, parsed in a single pass over the
+    BLOCKS section. Each block is flattened (nested inserts included) at
+    most once and kept as NumPy arrays in block coordinates.
+    """
+
+    def __init__(self, index):
+        self._defs = {}       # name -> (base_x, base_y, GeometryAccumulator)
+        self._flat = {}       # name -> (circles (N, 3), points (M, 2), paths)
+
+        name = None
+        geom = None
+        codes = dict(ENTITY_CODES, BLOCK={2, 10, 20}, ENDBLK=set())
+        for etype, data in index.iter_records(codes, section="BLOCKS"):
+            if etype == "BLOCK":
+                name = data.get(2, [""])[0]
+                geom = GeometryAccumulator()
+                self._defs[name] = (_first(data, 10), _first(data, 20), geom)
+            elif etype == "ENDBLK":
+                name = geom = None
+            elif geom is not None:
+                ENTITY_HANDLERS[etype](data, geom)
+
+    def flattened(self, name, depth=0):
+        """(circles, points, paths) of a block in its own coordinates."""
+        if name in self._flat:
+            return self._flat[name]
+        if name not in self._defs or depth > MAX_BLOCK_DEPTH:
+            return np.empty((0, 3)), np.empty((0, 2)), []
+
+        base_x, base_y, geom = self._defs[name]
+        circles, points, paths = geom.finish()
+        base = np.array((base_x, base_y))
+        circles = circles.copy()
+        circles[:, 1:3] -= base
+        points = points - base
+        paths = [(p - base, closed) for p, closed in paths]
+
+        if geom.inserts:
+            sub_c, sub_p, sub_paths = expand_inserts(geom.inserts, self, depth + 1)
+            circles = np.vstack((circles, sub_c))
+            points = np.vstack((points, sub_p))
+            paths.extend(sub_paths)
+
+        self._flat[name] = (circles, points, paths)
+        return self._flat[name]
+
+def insert_matrices(params):
+    """(K, 3, 3) affine transforms for every array instance of one INSERT."""
+    x, y, sx, sy, rot, cols, rows, col_sp, row_sp = params
+    cols, rows = max(cols, 1), max(rows, 1)
+
+    a = math.radians(rot)
+    R = np.array([[math.cos(a), -math.sin(a)], [math.sin(a), math.cos(a)]])
+
+    ci, ri = np.meshgrid(np.arange(cols), np.arange(rows), indexing="ij")
+    offsets = np.column_stack((ci.ravel() * col_sp, ri.ravel() * row_sp)) @ R.T
+
+    M = np.zeros((len(offsets), 3, 3))
+    M[:, :2, :2] = R @ np.diag((sx, sy))
+    M[:, 0, 2] = x + offsets[:, 0]
+    M[:, 1, 2] = y + offsets[:, 1]
+    M[:, 2, 2] = 1.0
+    return M
+
+def _transform(M, points):
+    if not len(points):
+        return np.empty((0, 2))
+    out = np.einsum("kij,mj->kmi", M[:, :2, :2], points) + M[:, None, :2, 2]
+    return out.reshape(-1, 2)
+
+def _transform_paths(M, paths):
+    """Apply every instance transform to a list of (points, closed) paths."""
+    if not paths:
+        return []
+    lengths = [len(p) for p, _ in paths]
+    flat = _transform(M, np.vstack([p for p, _ in paths]))
+    out = []
+    for inst in np.split(flat, len(M)):
+        out.extend(zip(split_samples(inst, lengths), (c for _, c in paths)))
+    return out
+
+def expand_inserts(inserts, blocks, depth=0):
+    """Place block geometry for each INSERT; returns (circles, points, paths)."""
+    all_c = [np.empty((0, 3))]
+    all_p = [np.empty((0, 2))]
+    all_paths = []
+
+    for name, params in inserts:
+        circles, points, paths = blocks.flattened(name, depth)
+        if not len(circles) and not len(points):
+            continue
+
+        M = insert_matrices(params)
+        sx, sy = params[2], params[3]
+
+        if len(circles) and math.isclose(abs(sx), abs(sy)):
+            centers = _transform(M, circles[:, 1:3])
+            radii = np.tile(circles[:, 0] * abs(sx), len(M))
+            all_c.append(np.column_stack((radii, centers)))
+        elif len(circles):
+            # non-uniform scale turns circles into ellipses: keep as outline
+            arcs = np.column_stack((circles[:, 1], circles[:, 2], circles[:, 0],
+                                    np.zeros(len(circles)), np.full(len(circles), 360.0)))
+            pts, counts = tessellate_arcs(arcs, with_counts=True)
+            all_p.append(_transform(M, pts))
+            all_paths.extend(_transform_paths(M, [(p[:-1], True) for p in split_samples(pts, counts)]))
+
+        all_p.append(_transform(M, points))
+        all_paths.extend(_transform_paths(M, paths))
+
+    return np.vstack(all_c), np.vstack(all_p), all_paths
+
+# ==========================================================
+# CHUNK-PARALLEL ENTITIES PARSING
+# ==========================================================
+PARALLEL_MIN_BYTES = 8 * 1024 * 1024    # smaller ENTITIES sections parse serially
+# Parallel parsing is opt-in (workers=N, or 0 for one per CPU): callers that
+# already run in pools (cad_catalog) or threads (api_server) stay serial.
+CHUNKS_PER_WORKER = 4
+
+# records that continue the previous entity; never split in front of them
+_CONTINUATION_RECORDS = {b"VERTEX", b"SEQEND", b"ATTRIB"}
+
+_entity_pool = None
+_entity_pool_workers = None
+
+def _get_entity_pool(workers):
+    global _entity_pool, _entity_pool_workers
+    if _entity_pool is None or _entity_pool_workers != workers:
+        if _entity_pool is not None:
+            _entity_pool.shutdown(wait=False)
+        _entity_pool = ProcessPoolExecutor(max_workers=workers)
+        _entity_pool_workers = workers
+    return _entity_pool
+
+def shutdown_entity_pool():
+    """Stop the chunk-parsing workers (the next parallel parse starts new ones).
+    Returns False if none were running."""
+    global _entity_pool, _entity_pool_workers
+    if _entity_pool is None:
+        return False
+    _entity_pool.shutdown(wait=True)
+    _entity_pool = _entity_pool_workers = None
+    return True
+
+def split_entity_ranges(mm, start, end, n_chunks):
+    """Byte ranges covering [start, end) that each begin at a whole record."""
+    cuts = [start]
+    for k in range(1, n_chunks):
+        pos = start + (end - start) * k // n_chunks
+        while True:
+            m = _RECORD_START_RE.search(mm, max(pos, cuts[-1] + 1), end)
+            if m is None or m.group(1).strip().upper() not in _CONTINUATION_RECORDS:
+                break
+            pos = m.end()
+        if m is None:
             break
+        cuts.append(m.start())
+    cuts.append(end)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+def _accumulate(records):
+    geom = GeometryAccumulator()
+    for etype, data in records:
+        ENTITY_HANDLERS[etype](data, geom)
+    return geom.finish_arrays(), geom.inserts
+
+def parse_entity_range(path, start, end, entity_codes=ENTITY_CODES):
+    """
+    Worker: parse one ENTITIES byte range straight off a read-only map of
+    the file (the OS page cache is shared, nothing is copied in).
+    Returns flat arrays (see GeometryAccumulator.finish_arrays) + inserts.
+    """
+    index = dxf_section_index(path)
+    return _accumulate(index.iter_records(entity_codes, start=start, end=end))
+
+def _parse_entities(index, workers, entity_codes=ENTITY_CODES):
+    """(circles, path_points, path_ends, path_closed), inserts"""
+    start, end = index.sections.get("ENTITIES", (0, 0))
+    if workers is None:
+        workers = 1
+    elif workers == 0:
+        workers = os.cpu_count() or 1
+    parallel = (not index.binary and workers > 1
+                and end - start >= PARALLEL_MIN_BYTES)
+
+    if not parallel:
+        return _accumulate(index.iter_records(entity_codes))
+
+    with open(index.path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        ranges = split_entity_ranges(mm, start, end, workers * CHUNKS_PER_WORKER)
+
+    pool = _get_entity_pool(workers)
+    futures = [pool.submit(parse_entity_range, index.path, a, b, entity_codes)
+               for a, b in ranges]
+
+    parts, inserts = [], []
+    offset = 0
+    for fut in futures:
+        (c, pp, ends, closed), ins = fut.result()
+        parts.append((c, pp, ends + offset, closed))
+        offset += len(pp)
+        inserts.extend(ins)
+
+    merged = tuple(np.concatenate(col) for col in zip(*parts))
+    return merged, inserts
+
+# ==========================================================
+# DXF PARSER
+# ==========================================================
+def _resolve_entity_codes(entity_codes):
+    if entity_codes is None:
+        return ENTITY_CODES
+    if isinstance(entity_codes, dict):
+        return {t: set(c) for t, c in entity_codes.items() if t in ENTITY_HANDLERS}
+    return {t: ENTITY_CODES[t] for t in entity_codes if t in ENTITY_HANDLERS}
+
+def parse_dxf_arrays(path, entity_codes=None, workers=None, simplify_tol=None):
+    """
+    Memory-bounded parse: flat NumPy arrays in mm, no per-point objects.
+      circles     (N, 3)  r, cx, cy
+      points      (M, 2)  every path back to back (the outline points)
+      path_ends   (P,)    end offset of each path in `points`
+      path_closed (P,)    closed flag per path
+    entity_codes limits what is read: a list of entity types, or
+    {type: {group codes}}; everything else is skipped while tokenizing.
+    simplify_tol (mm) drops duplicate entities and Douglas-Peuckers every
+    path; the reduction is reported under "simplify".
+    workers > 1 (0 = one per CPU) parses large ENTITIES sections in chunks
+    across a process pool; the default is serial.
+    """
+    index = dxf_section_index(path)
+    entity_codes = _resolve_entity_codes(entity_codes)
+    arrays, inserts = _parse_entities(index, workers, entity_codes)
+    circles, points, path_ends, path_closed = arrays
+
+    if inserts and "INSERT" in entity_codes:
+        ins_c, _, ins_paths = expand_inserts(inserts, BlockLibrary(index))
+        circles = np.vstack((circles, ins_c))
+        if ins_paths:
+            lengths = [len(p) for p, _ in ins_paths]
+            path_ends = np.concatenate((path_ends, len(points) + np.cumsum(lengths)))
+            path_closed = np.concatenate((path_closed, [c for _, c in ins_paths]))
+            points = np.vstack([points] + [p for p, _ in ins_paths])
+
+    # ---------- Units ----------
+    try:
+        insunits = int(index.header_value("$INSUNITS"))
+    except (TypeError, ValueError):
+        insunits = None
     unit_to_mm = INSUNITS_TO_MM.get(insunits, 1.0)
 
-    # ---------- Entity reader ----------
-    def read_entity(k):
-        ent = {"type": tokens[k][1], "data": {}}
-        j = k + 1
-        while j < len(tokens) and tokens[j][0] != "0":
-            ent["data"].setdefault(tokens[j][0], []).append(tokens[j][1])
-            j += 1
-        return ent, j
-
-    # ---------- Read ENTITIES ----------
-    entities = []
-    section = None
-    i = 0
-    while i < len(tokens):
-        code, val = tokens[i]
-        if code == "0" and val == "SECTION":
-            section = tokens[i+1][1]
-            i += 2
-            continue
-        if section == "ENTITIES" and code == "0":
-            ent, i = read_entity(i)
-            entities.append(ent)
-            continue
-        i += 1
-
-    circles = []
-    outer_points = []
-
-    # ---------- Process entities ----------
-    for ent in entities:
-        t = ent["type"].upper()
-        d = ent["data"]
-
-        if t == "CIRCLE":
-            r = float(d.get("40", [0])[0]) * unit_to_mm
-            cx = float(d.get("10", [0])[0]) * unit_to_mm
-            cy = float(d.get("20", [0])[0]) * unit_to_mm
-            circles.append({"r": r, "d": 2 * r, "cx": cx, "cy": cy})
-
-        if t == "LINE":
-            x1 = float(d.get("10", [0])[0]) * unit_to_mm
-            y1 = float(d.get("20", [0])[0]) * unit_to_mm
-            x2 = float(d.get("11", [0])[0]) * unit_to_mm
-            y2 = float(d.get("21", [0])[0]) * unit_to_mm
-            outer_points.extend([(x1, y1), (x2, y2)])
-
-        if t in ("LWPOLYLINE", "POLYLINE"):
-            xs = [float(v) * unit_to_mm for v in d.get("10", [])]
-            ys = [float(v) * unit_to_mm for v in d.get("20", [])]
-            outer_points.extend(list(zip(xs, ys)))
+    arrays = {
+        "circles": circles * unit_to_mm,
+        "points": points * unit_to_mm,
+        "path_ends": path_ends.astype(np.int64),
+        "path_closed": path_closed.astype(bool),
+        "unit_to_mm": unit_to_mm,
+        "simplify": None,
+    }
+
+    if simplify_tol is not None:
+        (arrays["circles"], arrays["points"], arrays["path_ends"],
+         arrays["path_closed"], arrays["simplify"]) = simplify_geometry(
+            arrays["circles"], arrays["points"], arrays["path_ends"],
+            arrays["path_closed"], simplify_tol)
+
+    return arrays
+
+def geometry_from_arrays(arrays):
+    """parse_dxf_arrays() output as (circle dicts, outline points, paths)."""
+    circles = [{"r": r, "d": 2 * r, "cx": cx, "cy": cy}
+               for r, cx, cy in arrays["circles"].tolist()]
+    outer_points = [tuple(p) for p in arrays["points"].tolist()]
+    paths = paths_from_arrays(arrays["points"], arrays["path_ends"], arrays["path_closed"])
+
+    return circles, outer_points, paths
 
+def parse_dxf_geometry(path, workers=None, simplify_tol=None):
+    """
+    Full parse: (circles, outline points, paths) in mm.
+    paths are per-entity (points (N, 2), closed) polylines for topology.
+    Large ENTITIES sections are parsed in chunks across `workers`
+    processes when asked for (default: serial).
+    """
+    return geometry_from_arrays(
+        parse_dxf_arrays(path, workers=workers, simplify_tol=simplify_tol))
+
+def parse_dxf(path, workers=None):
+    circles, outer_points, _ = parse_dxf_geometry(path, workers)
     return circles, outer_points
 
 # ==========================================================
@@ -107,91 +1018,231 @@ def bounding_box(points):
     ys = [p[1] for p in points]
     return min(xs), max(xs), min(ys), max(ys)
 
-# ==========================================================
-# MAIN
-# ==========================================================
-if __name__ == "__main__":
+CIRCLE_MATCH_TOL_MM = 1e-3
 
-    # --------- CLI INPUT ----------
-    if len(sys.argv) < 2:
-        print("USAGE: python cad_extractor.py <input_file.dxf>")
-        sys.exit(1)
+def merge_circles(circles, extra, tol=CIRCLE_MATCH_TOL_MM):
+    """circles + the extra ones not already present (same center and r)."""
+    if not extra:
+        return circles
+    if not circles:
+        return list(extra)
 
-    DXF_FILE = sys.argv[1]
+    have = np.array([(c["r"], c["cx"], c["cy"]) for c in circles])
+    new = np.array([(c["r"], c["cx"], c["cy"]) for c in extra])
+    dup = (np.abs(new[:, None, :] - have[None, :, :]) <= tol).all(axis=2).any(axis=1)
+    return circles + [c for c, d in zip(extra, dup) if not d]
 
-    if not os.path.exists(DXF_FILE):
-        raise FileNotFoundError(f"DXF file not found: {DXF_FILE}")
+# ==========================================================
+# PART CLASSIFICATION + DIMENSIONS
+# ==========================================================
+# bump whenever parse_dxf / derive_dimensions output changes
+EXTRACTOR_VERSION = 7
 
-    circles, outer_pts = parse_dxf(DXF_FILE)
+DIMENSION_LABELS = {
+    "outer_diameter": "Outer Diameter",
+    "inner_diameter": "Inner Diameter",
+    "outer_width": "Outer Width",
+    "outer_height": "Outer Height",
+    "across_flats": "Across Flats",
+}
 
+def derive_dimensions(circles, outer_pts, topology=None):
+    """
+    Classify the part from its geometry.
+    `topology` (from topology.build_topology) is used when available so
+    split or duplicated outline segments still classify; raw point counts
+    are the fallback.
+    Returns (part_label, [(dimension_type, value_mm), ...]).
+    """
     if not circles:
         raise ValueError("No CIRCLE entity found in DXF")
 
     inner = min(circles, key=lambda c: c["r"])
+    outer_loop = topology["outer"] if topology else None
 
-    # --------- OUTPUT CSV ----------
-    OUTPUT_CSV = "dxf_measurements.csv"
-
-    rows = []
-
-    print("\n========== DXF PART ANALYSIS ==========\n")
-
-    # ------------------------------------------------------
-    # CASE 1: BALL BEARING / ROUND WASHER
-    # ------------------------------------------------------
-    if len(circles) >= 2 and not outer_pts:
+    # ---------- CASE 1: BALL BEARING / ROUND WASHER ----------
+    round_outline = outer_loop is not None and outer_loop.get("circle") is not None
+    if len(circles) >= 2 and (not outer_pts or round_outline):
         outer = max(circles, key=lambda c: c["r"])
-
-        print("Detected Part : BALL BEARING / ROUND WASHER")
-        print(f"Outer Diameter : {outer['d']:.3f} mm")
-        print(f"Inner Diameter : {inner['d']:.3f} mm")
-
-        rows.extend([
+        return "BALL BEARING / ROUND WASHER", [
             ("outer_diameter", outer["d"]),
             ("inner_diameter", inner["d"])
-        ])
+        ]
 
-    # ------------------------------------------------------
-    # CASE 2: SQUARE WASHER
-    # ------------------------------------------------------
-    elif len(outer_pts) == 4:
-        minx, maxx, miny, maxy = bounding_box(outer_pts)
+    # ---------- CASE 2/3 FROM LOOP TOPOLOGY ----------
+    if outer_loop is not None:
+        minx, maxx, miny, maxy = outer_loop["bbox"]
+        box_area = (maxx - minx) * (maxy - miny)
 
-        print("Detected Part : SQUARE WASHER")
-        print(f"Outer Width   : {maxx - minx:.3f} mm")
-        print(f"Outer Height  : {maxy - miny:.3f} mm")
-        print(f"Inner Diameter: {inner['d']:.3f} mm")
+        if outer_loop["corners"] == 4 and box_area > 0 \
+                and outer_loop["area"] / box_area > 0.99:
+            return "SQUARE WASHER", [
+                ("outer_width", maxx - minx),
+                ("outer_height", maxy - miny),
+                ("inner_diameter", inner["d"])
+            ]
 
-        rows.extend([
+        if outer_loop["corners"] == 6:
+            return "HEX NUT", [
+                ("across_flats", maxx - minx),
+                ("inner_diameter", inner["d"])
+            ]
+
+    # ---------- CASE 2: SQUARE WASHER ----------
+    if len(outer_pts) == 4:
+        minx, maxx, miny, maxy = bounding_box(outer_pts)
+        return "SQUARE WASHER", [
             ("outer_width", maxx - minx),
             ("outer_height", maxy - miny),
             ("inner_diameter", inner["d"])
-        ])
+        ]
 
-    # ------------------------------------------------------
-    # CASE 3: HEX NUT
-    # ------------------------------------------------------
-    elif len(outer_pts) == 6:
+    # ---------- CASE 3: HEX NUT ----------
+    if len(outer_pts) == 6:
         minx, maxx, miny, maxy = bounding_box(outer_pts)
-
-        print("Detected Part : HEX NUT")
-        print(f"Across Flats  : {maxx - minx:.3f} mm")
-        print(f"Inner Diameter: {inner['d']:.3f} mm")
-
-        rows.extend([
+        return "HEX NUT", [
             ("across_flats", maxx - minx),
             ("inner_diameter", inner["d"])
-        ])
+        ]
 
-    else:
-        raise ValueError("Unsupported or malformed DXF geometry")
+    raise ValueError("Unsupported or malformed DXF geometry")
 
-    # --------- WRITE CSV ----------
-    with open(OUTPUT_CSV, "w", newline="") as f:
+def component_type(dimension_types):
+    """Vision recipe for a set of CAD dimension types (no geometry, e.g. STL)."""
+    return recipe_for_dimensions(dimension_types)
+
+def write_measurements_csv(rows, path):
+    with open(path, "w", newline="") as f:
         writer = csv.writer(f)
         writer.writerow(["type", "value_mm"])
         for r in rows:
             writer.writerow(r)
 
+# ==========================================================
+# IN-PROCESS API
+# ==========================================================
+@dataclass
+class CadDimensions:
+    """Result of extract_cad(): part label, dimensions and raw geometry (mm)."""
+    path: str
+    part: str
+    rows: list
+    circles: list = field(default_factory=list)
+    outer_points: list = field(default_factory=list)
+    loops: list = field(default_factory=list)
+    simplify: dict = None
+    fingerprint: list = None
+
+    @property
+    def dimensions(self):
+        return {t: float(v) for t, v in self.rows}
+
+    @property
+    def component_type(self):
+        return recipe_for_part(self.fingerprint, (t for t, _ in self.rows))
+
+    def to_dict(self):
+        return {
+            "part": self.part,
+            "component_type": self.component_type,
+            "dimensions": self.dimensions,
+            "fingerprint": fingerprint_dict(self.fingerprint) if self.fingerprint else None,
+            "loops": self.loops,
+        }
+
+def extract_geometry(path, simplify_tol=None):
+    """
+    Uncached extraction core. Never raises on unclassifiable geometry;
+    the message is returned under "error" so it can be cached too.
+    """
+    arrays = parse_dxf_arrays(path, simplify_tol=simplify_tol)
+    circles, outer_pts, paths = geometry_from_arrays(arrays)
+    topo = build_topology(paths)
+    # polygonized / spline circles count as circles too
+    circles = merge_circles(circles, loop_circles(topo))
+    try:
+        part, rows = derive_dimensions(circles, outer_pts, topo)
+        error = None
+    except ValueError as e:
+        part, rows, error = None, [], str(e)
+
+    loops = loop_summary(topo)
+    return {
+        "circles": circles,
+        "outer_points": outer_pts,
+        "part": part,
+        "dimensions": rows,
+        "loops": loops,
+        "fingerprint": fingerprint(circles, loops).tolist(),
+        "simplify": arrays["simplify"],
+        "error": error,
+    }
+
+def extract_cad(path, use_cache=True, simplify_tol=None):
+    """
+    Parse a DXF and derive its dimensions without spawning the CLI.
+    Raises FileNotFoundError / ValueError like the command line tool.
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"DXF file not found: {path}")
+
+    if use_cache:
+        from cad_cache import extract_cached
+        entry = extract_cached(path, simplify_tol=simplify_tol)
+    else:
+        entry = extract_geometry(path, simplify_tol)
+
+    if entry["error"]:
+        raise ValueError(entry["error"])
+
+    return CadDimensions(str(path), entry["part"], list(entry["dimensions"]),
+                         entry["circles"], entry["outer_points"], entry["loops"],
+                         entry.get("simplify"), entry.get("fingerprint"))
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+
+    # --------- CLI INPUT ----------
+    flags = [a for a in sys.argv[1:] if a.startswith("--")]
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    use_cache = "--no-cache" not in flags
+
+    simplify_tol = None
+    for flag in flags:
+        if flag == "--simplify":
+            simplify_tol = SIMPLIFY_TOL_MM
+        elif flag.startswith("--simplify="):
+            simplify_tol = float(flag.split("=", 1)[1])
+
+    if not args:
+        print("USAGE: python cad_extractor.py <input_file.dxf> [--no-cache] [--simplify[=MM]]")
+        sys.exit(1)
+
+    DXF_FILE = args[0]
+
+    cad = extract_cad(DXF_FILE, use_cache=use_cache, simplify_tol=simplify_tol)
+    part, rows = cad.part, cad.rows
+
+    # --------- OUTPUT CSV ----------
+    OUTPUT_CSV = "dxf_measurements.csv"
+
+    print("\n========== DXF PART ANALYSIS ==========\n")
+    print(f"Detected Part : {part}")
+    for dim_type, value in rows:
+        print(f"{DIMENSION_LABELS.get(dim_type, dim_type):<15}: {value:.3f} mm")
+
+    if cad.simplify:
+        st = cad.simplify
+        print(f"\nSimplified at {st['tolerance_mm']} mm: "
+              f"{st['vertices_in']} -> {st['vertices_out']} vertices "
+              f"(-{st['vertex_reduction'] * 100:.1f}%), "
+              f"{st['duplicate_paths']} duplicate paths, "
+              f"{st['duplicate_circles']} duplicate circles")
+
+    # --------- WRITE CSV ----------
+    write_measurements_csv(rows, OUTPUT_CSV)
+
     print(f"\nCAD measurements saved to {OUTPUT_CSV}")
     print("\n======================================\n")
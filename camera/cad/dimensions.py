@@ -0,0 +1,72 @@
+# ==========================================================
+# DIMENSION ONTOLOGY
+# ==========================================================
+# canonical dimension (as written by cad_extractor) -> accepted aliases
+DIMENSION_ALIASES = {
+    "outer_diameter": ("od", "outer_dia", "outer_d", "outside_diameter"),
+    "inner_diameter": ("id", "inner_dia", "inner_d", "inside_diameter",
+                       "bore", "bore_diameter", "hole_diameter"),
+    "outer_width": ("width", "w", "outer_w"),
+    "outer_height": ("height", "h", "outer_h"),
+    "across_flats": ("af", "flats", "across_flat"),
+}
+
+# dimensions each vision recipe measures (fingerprint.RECIPES values)
+PART_DIMENSIONS = {
+    "bearing": ("outer_diameter", "inner_diameter"),
+    "washer": ("outer_diameter", "inner_diameter"),
+    "square_washer": ("outer_width", "outer_height", "inner_diameter"),
+    "hex_nut": ("across_flats", "inner_diameter"),
+}
+
+# names whose meaning depends on the part (vision/square_washer.py writes
+# the hole as diameter_mm and the outer width as measurement_mm)
+PART_ALIASES = {
+    "square_washer": {"diameter": "inner_diameter", "measurement": "outer_width"},
+}
+
+_ALIASES = {c: c for c in DIMENSION_ALIASES}
+_ALIASES.update({a: c for c, aliases in DIMENSION_ALIASES.items() for a in aliases})
+
+# ==========================================================
+# LOOKUP
+# ==========================================================
+def normalize_name(name):
+    """'MEAS_OD_mm' / 'Outer Diameter' -> 'od' / 'outer_diameter'."""
+    name = str(name).strip().lower().replace(" ", "_").replace("-", "_")
+    for prefix in ("meas_", "cad_"):
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    if name.endswith("_mm"):
+        name = name[:-3]
+    return name
+
+def canonical_dimension(name, part=None):
+    """Canonical dimension for a column / CAD name, or None if unknown."""
+    name = normalize_name(name)
+    if part is not None:
+        dim = PART_ALIASES.get(part, {}).get(name)
+        if dim is not None:
+            return dim
+    return _ALIASES.get(name)
+
+def compile_dimension_map(columns, cad_keys, part=None):
+    """
+    {column: index into cad_keys} for every column whose canonical
+    dimension the CAD defines (and, for a known part, that the part's
+    recipe measures). Built once per inspection; other columns are left out.
+    """
+    cad_index = {}
+    for i, key in enumerate(cad_keys):
+        cad_index.setdefault(canonical_dimension(key, part) or normalize_name(key), i)
+
+    allowed = PART_DIMENSIONS.get(part)
+
+    mapping = {}
+    for col in columns:
+        dim = canonical_dimension(col, part)
+        if allowed is not None and dim not in allowed:
+            continue
+        if dim is not None and dim in cad_index:
+            mapping[col] = cad_index[dim]
+    return mapping
@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+SHAPE_CODES = {"none": 0, "round": 1, "quad": 4, "hex": 6, "polygon": 9}
+CODE_SHAPES = {v: k for k, v in SHAPE_CODES.items()}
+
+FINGERPRINT_FIELDS = [
+    "shape",            # SHAPE_CODES of the outer profile
+    "hole_count",       # circles inside the outer profile
+    "loop_count",       # closed loops in the drawing
+    "hole_loop_count",  # loops nested in the outer loop
+    "outer_size",       # mm: outer diameter / longest bbox side
+    "bore_ratio",       # smallest hole diameter / outer_size
+    "aspect",           # bbox width / height
+    "fill",             # outer area / bbox area
+]
+
+# (outer shape, has a bore) -> vision recipe; anything else is DEFAULT_RECIPE
+RECIPES = {
+    ("round", 1): "bearing",
+    ("quad", 1): "square_washer",
+    ("hex", 1): "hex_nut",
+    ("hex", 0): "hex_nut",
+}
+DEFAULT_RECIPE = "washer"
+
+# recipe -> live inspection script (relative to the camera directory)
+VISION_SCRIPTS = {
+    "bearing": os.path.join("vision", "bearing.py"),
+    "washer": os.path.join("vision", "washer.py"),
+    "square_washer": os.path.join("vision", "square_washer.py"),
+    "hex_nut": os.path.join("vision", "nut.py"),
+}
+
+# dimension type -> outer shape, for sources without geometry (STL CSV)
+DIMENSION_SHAPES = [
+    ("outer_diameter", "round"),
+    ("outer_width", "quad"),
+    ("across_flats", "hex"),
+]
+
+_SAME_SIZE = 0.999  # circles this close to the outer size are the outer edge
+
+# ==========================================================
+# FINGERPRINT
+# ==========================================================
+def _outer_shape(outer):
+    if outer.get("circle") is not None:
+        return "round"
+    return {4: "quad", 6: "hex"}.get(outer["corners"], "polygon")
+
+def hole_circles(circles, outer_size):
+    """Circles smaller than the outer profile (the outer edge itself excluded)."""
+    return [c for c in circles if c["d"] < outer_size * _SAME_SIZE]
+
+def fingerprint(circles, loops):
+    """
+    Compact numeric description of a part (float array, FINGERPRINT_FIELDS
+    order) from extracted circles and loop_summary() records.
+    """
+    diameters = sorted((c["d"] for c in circles), reverse=True)
+    outer = next((l for l in loops if l["role"] == "outer"), None)
+
+    if outer is not None:
+        shape = _outer_shape(outer)
+        minx, maxx, miny, maxy = outer["bbox"]
+        w, h = maxx - minx, maxy - miny
+        size = 2 * outer["circle"]["r"] if shape == "round" else max(w, h)
+        aspect = w / h if h > 0 else 0.0
+        fill = outer["area"] / (w * h) if w * h > 0 else 0.0
+    elif diameters:
+        shape = "round"
+        size = diameters[0]
+        aspect, fill = 1.0, np.pi / 4
+    else:
+        shape, size, aspect, fill = "none", 0.0, 0.0, 0.0
+
+    holes = sorted(c["d"] for c in hole_circles(circles, size))
+    bore = holes[0] / size if holes and size > 0 else 0.0
+
+    return np.array([
+        SHAPE_CODES[shape],
+        len(holes),
+        len(loops),
+        sum(1 for l in loops if l["role"] == "hole"),
+        size,
+        bore,
+        aspect,
+        fill,
+    ], dtype=np.float64)
+
+def fingerprint_dict(fp):
+    return {k: float(v) for k, v in zip(FINGERPRINT_FIELDS, fp)}
+
+# ==========================================================
+# RECIPE LOOKUP (constant time)
+# ==========================================================
+def recipe_key(fp):
+    return CODE_SHAPES.get(int(fp[0]), "polygon"), min(int(fp[1]), 1)
+
+def recipe_for(fp):
+    """Vision recipe for a fingerprint."""
+    return RECIPES.get(recipe_key(fp), DEFAULT_RECIPE)
+
+def dimension_shape(types):
+    return next((s for t, s in DIMENSION_SHAPES if t in types), "none")
+
+def recipe_for_dimensions(dimension_types):
+    """Vision recipe from dimension types only (no geometry available)."""
+    types = {str(t).strip().lower() for t in dimension_types}
+    return RECIPES.get((dimension_shape(types), int("inner_diameter" in types)), DEFAULT_RECIPE)
+
+def recipe_for_part(fp, dimension_types):
+    """
+    Vision recipe for an extracted part: the fingerprint's, unless there is
+    none or its outer shape disagrees with the derived dimensions (e.g. a
+    hex drawn as an open polyline has no outer loop, so the fingerprint
+    only sees circles while derive_dimensions classified it by point count).
+    """
+    types = {str(t).strip().lower() for t in dimension_types}
+    if fp is None or dimension_shape(types) not in ("none", recipe_key(fp)[0]):
+        return recipe_for_dimensions(types)
+    return recipe_for(fp)
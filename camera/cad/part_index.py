@@ -0,0 +1,119 @@
+import sys
+
+import numpy as np
+
+from cad_catalog import CATALOG_FILE, DIMENSION_COLUMNS, load_catalog
+from dimensions import canonical_dimension, normalize_name
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+DEFAULT_NEIGHBOURS = 5
+SEED_WINDOW = 32        # parts on each side of the sort key used to seed the radius
+
+# ==========================================================
+# INDEX
+# ==========================================================
+def _dimension_name(name):
+    return canonical_dimension(name) or normalize_name(name)
+
+class PartIndex:
+    """
+    Nearest CAD parts for a set of measured dimensions (mm).
+    Parts are grouped by which dimensions they define (OD/ID, W/H/ID,
+    AF/ID, ...); each group is sorted on its first dimension, so a query
+    is two binary searches plus one small vectorized distance step.
+    """
+
+    def __init__(self, catalog):
+        self.groups = {}
+        if catalog is None or not len(catalog):
+            return
+
+        ok = catalog[catalog["error"] == ""] if "error" in catalog else catalog
+        info = [c for c in ("part_id", "part", "recipe") if c in ok]
+        values = ok[DIMENSION_COLUMNS].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+
+        for mask in np.unique(present, axis=0):
+            if not mask.any():
+                continue
+            rows = np.flatnonzero((present == mask).all(axis=1))
+            dims = tuple(c for c, m in zip(DIMENSION_COLUMNS, mask) if m)
+            mat = values[rows][:, mask]
+
+            order = np.argsort(mat[:, 0], kind="stable")
+            self.groups[dims] = {
+                "matrix": mat[order],
+                "primary": mat[order, 0],
+                "parts": ok.iloc[rows[order]][info].to_dict("records"),
+            }
+
+    def __len__(self):
+        return sum(len(g["primary"]) for g in self.groups.values())
+
+    def _group_query(self, group, q, k):
+        primary, mat = group["primary"], group["matrix"]
+        n = len(primary)
+        pos = int(np.searchsorted(primary, q[0]))
+
+        # k-th best distance among the closest parts on the sort key bounds
+        # the exact search window, since dist >= |primary - q0|
+        seed = max(k, SEED_WINDOW)
+        lo, hi = max(0, pos - seed), min(n, pos + seed)
+        d = np.sqrt(((mat[lo:hi] - q) ** 2).sum(axis=1))
+        radius = np.partition(d, min(k, len(d)) - 1)[min(k, len(d)) - 1]
+
+        lo = int(np.searchsorted(primary, q[0] - radius, side="left"))
+        hi = int(np.searchsorted(primary, q[0] + radius, side="right"))
+        d = np.sqrt(((mat[lo:hi] - q) ** 2).sum(axis=1))
+        best = np.argsort(d, kind="stable")[:k]
+        return [(float(d[i]), lo + int(i)) for i in best]
+
+    def query(self, measurements, k=DEFAULT_NEIGHBOURS, max_distance=None):
+        """
+        measurements: {dimension: mm}; keys are catalog dimension names or
+        their aliases (OD_mm, ID, AF, ...). Only parts whose dimensions are all
+        measured are candidates. Returns the k nearest as dicts with the
+        Euclidean distance in mm, closest first.
+        """
+        meas = {_dimension_name(n): float(v) for n, v in measurements.items()}
+
+        hits = []
+        for dims, group in self.groups.items():
+            if not all(d in meas for d in dims):
+                continue
+            q = np.array([meas[d] for d in dims])
+            for dist, i in self._group_query(group, q, k):
+                if max_distance is not None and dist > max_distance:
+                    continue
+                hits.append((dist, dims, group, i))
+
+        hits.sort(key=lambda h: h[0])
+        return [
+            dict(group["parts"][i], distance_mm=dist,
+                 dimensions={d: float(v) for d, v in zip(dims, group["matrix"][i])})
+            for dist, dims, group, i in hits[:k]
+        ]
+
+def load_part_index(path=CATALOG_FILE):
+    return PartIndex(load_catalog(path))
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USAGE: python part_index.py outer_diameter=30 inner_diameter=10 [...]")
+        sys.exit(1)
+
+    query = {}
+    for arg in sys.argv[1:]:
+        name, _, value = arg.partition("=")
+        query[name] = float(value)
+
+    index = load_part_index()
+    print(f"\n{len(index)} indexed parts\n")
+    for hit in index.query(query):
+        print(f"{hit['distance_mm']:>9.3f} mm  {hit['part_id']}  ({hit['part']})")
+    print()
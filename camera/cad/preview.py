@@ -0,0 +1,210 @@
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from cad_cache import CadCache, file_digest
+from cad_extractor import EXTRACTOR_VERSION, parse_dxf_arrays
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+PREVIEW_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "preview_cache"
+)
+
+MAX_ENTRIES = 2048                  # whole PREVIEW_DIR, split evenly between the formats
+MAX_BYTES = 256 * 1024 * 1024
+
+DEFAULT_SIZE = 512
+MAX_SIZE = 4096
+MARGIN_PX = 8
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+
+# ==========================================================
+# VIEW TRANSFORM
+# ==========================================================
+def _extent(arrays):
+    circles, points = arrays["circles"], arrays["points"]
+    lo = [points.min(axis=0)] if len(points) else []
+    hi = [points.max(axis=0)] if len(points) else []
+    if len(circles):
+        r, c = circles[:, :1], circles[:, 1:]
+        lo.append((c - r).min(axis=0))
+        hi.append((c + r).max(axis=0))
+    if not lo:
+        raise ValueError("Nothing to preview in DXF")
+    return np.min(lo, axis=0), np.max(hi, axis=0)
+
+def _view(arrays, size):
+    """mm -> px scale and offset that fit the drawing in a size x size square."""
+    lo, hi = _extent(arrays)
+    span = max(float((hi - lo).max()), 1e-9)
+    scale = (size - 2 * MARGIN_PX) / span
+    center = (lo + hi) / 2
+    return scale, center
+
+def _segments(points, ends, closed):
+    """(start, end) points of every path segment, closing edges included."""
+    if not len(points):
+        return np.empty((0, 2)), np.empty((0, 2))
+    starts = np.concatenate(([0], ends[:-1]))
+    last = np.zeros(len(points), dtype=bool)
+    last[ends - 1] = True
+    a = np.flatnonzero(~last)
+    b = a + 1
+    a = np.concatenate((a, (ends - 1)[closed]))
+    b = np.concatenate((b, starts[closed]))
+    return points[a], points[b]
+
+# ==========================================================
+# PNG (vectorized rasterization)
+# ==========================================================
+def _ragged_samples(counts):
+    """(owner, t in [0, 1]) for counts[i] samples of item i."""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    first = np.cumsum(counts) - counts
+    k = np.arange(counts.sum()) - first[owner]
+    return owner, k / np.maximum(counts[owner] - 1, 1)
+
+def render_png(arrays, size=DEFAULT_SIZE):
+    """Grayscale line drawing (dark on white) encoded as PNG bytes."""
+    scale, center = _view(arrays, size)
+    half = size / 2
+
+    def to_px(pts):
+        return np.column_stack(((pts[:, 0] - center[0]) * scale + half,
+                                half - (pts[:, 1] - center[1]) * scale))
+
+    xs, ys = [], []
+
+    # every segment sampled at <= 1 px spacing, all at once
+    pa, pb = _segments(arrays["points"], arrays["path_ends"], arrays["path_closed"])
+    if len(pa):
+        pa, pb = to_px(pa), to_px(pb)
+        counts = np.ceil(np.hypot(*(pb - pa).T)).astype(np.int64) + 1
+        owner, t = _ragged_samples(counts)
+        pts = pa[owner] + (pb - pa)[owner] * t[:, None]
+        xs.append(pts[:, 0])
+        ys.append(pts[:, 1])
+
+    circles = arrays["circles"]
+    if len(circles):
+        r = circles[:, 0] * scale
+        c = to_px(circles[:, 1:])
+        counts = np.ceil(2 * np.pi * r).astype(np.int64) + 1
+        owner, t = _ragged_samples(counts)
+        a = 2 * np.pi * t
+        xs.append(c[owner, 0] + r[owner] * np.cos(a))
+        ys.append(c[owner, 1] + r[owner] * np.sin(a))
+
+    img = np.full((size, size), 255, np.uint8)
+    if xs:
+        x = np.clip(np.round(np.concatenate(xs)).astype(np.int64), 0, size - 1)
+        y = np.clip(np.round(np.concatenate(ys)).astype(np.int64), 0, size - 1)
+        img[y, x] = 0
+
+    ok, buf = cv2.imencode(".png", img)
+    if not ok:
+        raise ValueError("PNG encoding failed")
+    return buf.tobytes()
+
+# ==========================================================
+# SVG
+# ==========================================================
+def render_svg(arrays, size=DEFAULT_SIZE):
+    """SVG document in px coordinates of a size x size view."""
+    scale, center = _view(arrays, size)
+    half = size / 2
+
+    pts = arrays["points"]
+    px = np.column_stack(((pts[:, 0] - center[0]) * scale + half,
+                          half - (pts[:, 1] - center[1]) * scale))
+    coords = np.char.mod("%.2f", px)
+    pairs = np.char.add(np.char.add(coords[:, 0], ","), coords[:, 1]) if len(px) else []
+
+    out = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+           f'viewBox="0 0 {size} {size}">',
+           f'<rect width="{size}" height="{size}" fill="white"/>',
+           '<g fill="none" stroke="black" stroke-width="1">']
+
+    start = 0
+    for end, closed in zip(arrays["path_ends"].tolist(), arrays["path_closed"].tolist()):
+        tag = "polygon" if closed else "polyline"
+        out.append(f'<{tag} points="{" ".join(pairs[start:end])}"/>')
+        start = end
+
+    for r, cx, cy in arrays["circles"].tolist():
+        out.append(f'<circle cx="{(cx - center[0]) * scale + half:.2f}" '
+                   f'cy="{half - (cy - center[1]) * scale:.2f}" r="{r * scale:.2f}"/>')
+
+    out.append("</g></svg>")
+    return "\n".join(out).encode("utf-8")
+
+# ==========================================================
+# CACHE (one subdirectory per format, one file per content hash + size)
+# ==========================================================
+class PreviewCache(CadCache):
+    """
+    Rendered previews of one format on disk, evicted oldest-first like
+    CadCache. Each format gets its own directory (eviction only sees its
+    own files) and its share of the PREVIEW_DIR budget.
+    """
+
+    def __init__(self, fmt, root=None, max_entries=MAX_ENTRIES // len(FORMATS),
+                 max_bytes=MAX_BYTES // len(FORMATS)):
+        self.suffix = "." + fmt
+        super().__init__(root or os.path.join(PREVIEW_DIR, fmt), max_entries, max_bytes)
+
+    def key(self, path, size):
+        return f"{file_digest(path)}-v{EXTRACTOR_VERSION}-{size}px"
+
+    def get(self, key):
+        """Path of the cached file, or None."""
+        entry_path = self._entry_path(key)
+        try:
+            os.utime(entry_path)
+        except OSError:
+            return None
+        return entry_path
+
+    def put(self, key, data):
+        entry_path = self._publish(key, lambda f: f.write(data))
+
+        self.evict()
+        return entry_path
+
+_caches = {}
+
+def preview_file(path, size=DEFAULT_SIZE, fmt="png"):
+    """Path of a cached PNG / SVG preview of a DXF, rendered on a miss."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported preview format: {fmt}")
+    if not 16 <= size <= MAX_SIZE:
+        raise ValueError(f"Preview size must be 16..{MAX_SIZE} px")
+
+    cache = _caches.get(fmt)
+    if cache is None:
+        cache = _caches[fmt] = PreviewCache(fmt)
+
+    key = cache.key(path, size)
+    entry_path = cache.get(key)
+    if entry_path is None:
+        arrays = parse_dxf_arrays(path)
+        data = render_png(arrays, size) if fmt == "png" else render_svg(arrays, size)
+        entry_path = cache.put(key, data)
+
+    return entry_path
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("USAGE: python preview.py <input_file.dxf> [size_px] [png|svg]")
+        sys.exit(1)
+
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_SIZE
+    fmt = sys.argv[3] if len(sys.argv) > 3 else "png"
+    print(f"\nPreview saved as {preview_file(sys.argv[1], size, fmt)}\n")
@@ -0,0 +1,150 @@
+import numpy as np
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+SIMPLIFY_TOL_MM = 0.01      # default Douglas-Peucker tolerance
+DEDUPE_GRID_MM = 1e-3       # coordinates closer than this hash the same
+
+# ==========================================================
+# DUPLICATE ENTITIES
+# ==========================================================
+def _quantize(values, grid):
+    return np.round(np.asarray(values, dtype=np.float64) / grid).astype(np.int64)
+
+def dedupe_circles(circles, grid=DEDUPE_GRID_MM):
+    """(N, 3) r, cx, cy rows with exact (quantized) repeats removed, order kept."""
+    if len(circles) < 2:
+        return circles
+    _, first = np.unique(_quantize(circles, grid), axis=0, return_index=True)
+    return circles[np.sort(first)]
+
+def dedupe_paths(points, ends, closed, grid=DEDUPE_GRID_MM):
+    """
+    Keep-mask over paths: a path is dropped when an earlier path has the
+    same quantized points, walked either way round.
+    """
+    q = _quantize(points, grid)
+    starts = np.concatenate(([0], ends[:-1]))
+    keep = np.ones(len(ends), dtype=bool)
+    seen = set()
+
+    for i, (s, e) in enumerate(zip(starts.tolist(), ends.tolist())):
+        fwd = q[s:e]
+        rev = fwd[::-1]
+        key = min(fwd.tobytes(), rev.tobytes()), bool(closed[i])
+        if key in seen:
+            keep[i] = False
+        else:
+            seen.add(key)
+    return keep
+
+# ==========================================================
+# DOUGLAS-PEUCKER (all paths at once)
+# ==========================================================
+def douglas_peucker(points, ends, closed, tol=SIMPLIFY_TOL_MM):
+    """
+    Keep-mask over `points` for the flat path layout (points, ends, closed).
+    Every pass splits all still-active spans of all paths together: one
+    ragged distance evaluation, one reduceat for the farthest point.
+    Closed paths are anchored at their first point on both ends.
+    """
+    n = len(points)
+    keep = np.zeros(n, dtype=bool)
+    if not n:
+        return keep
+
+    starts = np.concatenate(([0], ends[:-1]))
+    closed = np.asarray(closed, dtype=bool)
+
+    # closed paths get their first point appended so the loop is split too
+    counts = ends - starts + closed
+    ext_ends = np.cumsum(counts)
+    ext_starts = ext_ends - counts
+    src = np.repeat(starts - ext_starts, counts) + np.arange(ext_ends[-1])
+    wrap = ext_ends[closed] - 1
+    src[wrap] = starts[closed]
+    pts = points[src]
+
+    ext_keep = np.zeros(len(pts), dtype=bool)
+    ext_keep[ext_starts] = True
+    ext_keep[ext_ends - 1] = True
+
+    a, b = ext_starts, ext_ends - 1
+    active = b - a >= 2
+    a, b = a[active], b[active]
+
+    while len(a):
+        inner = b - a - 1
+        first = np.cumsum(inner) - inner
+        owner = np.repeat(np.arange(len(a)), inner)
+        idx = a[owner] + 1 + np.arange(inner.sum()) - first[owner]
+
+        pa, pb = pts[a][owner], pts[b][owner]
+        chord = pb - pa
+        rel = pts[idx] - pa
+        length = np.hypot(chord[:, 0], chord[:, 1])
+        cross = np.abs(chord[:, 0] * rel[:, 1] - chord[:, 1] * rel[:, 0])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dist = np.where(length > 0, cross / length, np.hypot(rel[:, 0], rel[:, 1]))
+
+        far = np.maximum.reduceat(dist, first)
+        hit = np.flatnonzero(dist == far[owner])
+        _, pick = np.unique(owner[hit], return_index=True)
+        split_at = idx[hit[pick]]
+
+        split = far > tol
+        m = split_at[split]
+        ext_keep[m] = True
+
+        a = np.concatenate((a[split], m))
+        b = np.concatenate((m, b[split]))
+        active = b - a >= 2
+        a, b = a[active], b[active]
+
+    # fold back onto the original points (drop the appended wrap points)
+    real = np.ones(len(pts), dtype=bool)
+    real[wrap] = False
+    keep[src[real]] = ext_keep[real]
+    return keep
+
+# ==========================================================
+# SIMPLIFICATION STAGE
+# ==========================================================
+def simplify_geometry(circles, points, ends, closed, tol=SIMPLIFY_TOL_MM,
+                      grid=DEDUPE_GRID_MM):
+    """
+    Drop duplicate circles / paths, then Douglas-Peucker every path.
+    Returns (circles, points, ends, closed, stats) in the same flat layout.
+    """
+    ends = np.asarray(ends, dtype=np.int64)
+    closed = np.asarray(closed, dtype=bool)
+    vertices_in = len(points)
+    paths_in = len(ends)
+    circles_in = len(circles)
+
+    circles = dedupe_circles(circles, grid)
+
+    path_keep = dedupe_paths(points, ends, closed, grid)
+    if not path_keep.all():
+        counts = np.diff(np.concatenate(([0], ends)))
+        point_keep = np.repeat(path_keep, counts)
+        points = points[point_keep]
+        ends = np.cumsum(counts[path_keep])
+        closed = closed[path_keep]
+
+    keep = douglas_peucker(points, ends, closed, tol)
+    if len(ends):
+        starts = np.concatenate(([0], ends[:-1]))
+        ends = np.cumsum(np.add.reduceat(keep.astype(np.int64), starts))
+    points = points[keep]
+
+    stats = {
+        "tolerance_mm": tol,
+        "duplicate_circles": circles_in - len(circles),
+        "duplicate_paths": paths_in - len(ends),
+        "vertices_in": vertices_in,
+        "vertices_out": len(points),
+        "vertex_reduction": 1.0 - len(points) / vertices_in if vertices_in else 0.0,
+    }
+    return circles, points, ends, closed, stats
@@ -0,0 +1,275 @@
+import math
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from cad_cache import CadCache, file_digest
+from cad_extractor import EXTRACTOR_VERSION, merge_circles, parse_dxf_geometry
+from topology import build_topology, loop_circles
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+TEMPLATE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "template_cache"
+)
+
+MAX_ENTRIES = 64
+MAX_BYTES = 512 * 1024 * 1024
+MEMORY_BYTES = 128 * 1024 * 1024    # templates kept loaded in this process
+
+DEFAULT_ROTATION_STEP_DEG = 5.0
+MARGIN_PX = 4
+CIRCLE_SEGMENTS = 180
+SUBPIXEL_BITS = 4               # fixed-point precision handed to cv2 drawing
+
+# ==========================================================
+# PART OUTLINE (mm, centered on the outer profile)
+# ==========================================================
+def circle_polygon(cx, cy, r, n=CIRCLE_SEGMENTS):
+    a = np.linspace(0.0, 2 * np.pi, n, endpoint=False)
+    return np.column_stack((cx + r * np.cos(a), cy + r * np.sin(a)))
+
+def part_outline(path):
+    """
+    (outer polygon, [hole polygons]) in mm, centered on the outer bbox.
+    The outer profile is the largest closed loop, else the largest circle.
+    """
+    circles, _, paths = parse_dxf_geometry(path)
+    topo = build_topology(paths)
+    circles = merge_circles(circles, loop_circles(topo))
+
+    outer_loop = topo["outer"]
+    if outer_loop is not None and outer_loop["circle"] is None:
+        outer = outer_loop["points"]
+        holes = [l["points"] for l in topo["holes"] if l["circle"] is None]
+        outer_r = None
+    elif circles:
+        big = max(circles, key=lambda c: c["r"])
+        outer = circle_polygon(big["cx"], big["cy"], big["r"])
+        outer_r = big["r"]
+        holes = []
+    else:
+        raise ValueError("No outline or circle to render")
+
+    holes += [circle_polygon(c["cx"], c["cy"], c["r"]) for c in circles
+              if outer_r is None or c["r"] < outer_r * 0.999]
+
+    center = (outer.min(axis=0) + outer.max(axis=0)) / 2
+    return outer - center, [h - center for h in holes]
+
+# ==========================================================
+# RASTERIZATION
+# ==========================================================
+def _to_px(pts, mm_per_px, half):
+    # image rows grow downwards: flip y
+    px = np.column_stack((pts[:, 0] / mm_per_px + half, half - pts[:, 1] / mm_per_px))
+    return np.round(px * (1 << SUBPIXEL_BITS)).astype(np.int32)
+
+def render_template(outer, holes, mm_per_px, angle_deg=0.0, size=None):
+    """Binary mask (uint8 0/255) of a part rotated by angle_deg on a size x size canvas."""
+    if size is None:
+        size = template_size(outer, mm_per_px)
+
+    a = math.radians(angle_deg)
+    rot = np.array([[math.cos(a), math.sin(a)], [-math.sin(a), math.cos(a)]])
+    half = size / 2
+    outer_px = _to_px(outer @ rot, mm_per_px, half)
+    holes_px = [_to_px(h @ rot, mm_per_px, half) for h in holes]
+
+    mask = np.zeros((size, size), np.uint8)
+    cv2.fillPoly(mask, [outer_px], 255, cv2.LINE_8, SUBPIXEL_BITS)
+    if holes_px:
+        cv2.fillPoly(mask, holes_px, 0, cv2.LINE_8, SUBPIXEL_BITS)
+    return mask
+
+def distance_map(mask, scale=1):
+    """
+    Distance (float32, in full-resolution px) to the nearest mask outline.
+    scale > 1 computes it on a mask shrunk by that factor: the map is
+    scale times smaller and coarser, but much cheaper.
+    """
+    if scale > 1:
+        mask = cv2.resize(mask, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        mask = np.where(mask >= 128, 255, 0).astype(np.uint8)
+    outline = cv2.morphologyEx(mask, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    dist = cv2.distanceTransform(np.where(outline > 0, 0, 255).astype(np.uint8),
+                                 cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+    return dist * scale if scale > 1 else dist
+
+def template_size(outer, mm_per_px):
+    """Canvas side that fits the part at every rotation."""
+    radius = float(np.hypot(outer[:, 0], outer[:, 1]).max())
+    return int(math.ceil(2 * radius / mm_per_px)) + 2 * MARGIN_PX
+
+def render_templates(path, mm_per_px, rotation_step=DEFAULT_ROTATION_STEP_DEG):
+    """
+    Masks for every rotation step of one part, each cropped to its bounding
+    box (boxes: y, x, h, w on the size x size canvas) and bit-packed into
+    `bits` (rotation i is bits[starts[i]:starts[i + 1]]).
+    """
+    outer, holes = part_outline(path)
+    size = template_size(outer, mm_per_px)
+    angles = np.arange(0.0, 360.0, rotation_step)
+
+    boxes = np.zeros((len(angles), 4), np.int32)
+    packed = []
+    for i, angle in enumerate(angles):
+        mask = render_template(outer, holes, mm_per_px, angle, size)
+        x, y, w, h = cv2.boundingRect(mask)
+        boxes[i] = y, x, h, w
+        packed.append(np.packbits(mask[y:y + h, x:x + w] > 0, axis=None))
+
+    starts = np.zeros(len(angles) + 1, np.int64)
+    starts[1:] = np.cumsum([len(b) for b in packed])
+    return {
+        "angles": angles,
+        "boxes": boxes,
+        "starts": starts,
+        "bits": np.concatenate(packed) if packed else np.zeros(0, np.uint8),
+        "size": size,
+        "mm_per_px": float(mm_per_px),
+    }
+
+def template_mask(templates, i):
+    """Full-canvas uint8 0/255 mask of rotation i."""
+    y, x, h, w = templates["boxes"][i]
+    bits = templates["bits"][templates["starts"][i]:templates["starts"][i + 1]]
+    mask = np.zeros((templates["size"],) * 2, np.uint8)
+    mask[y:y + h, x:x + w] = np.unpackbits(bits, count=h * w).reshape(h, w) * 255
+    return mask
+
+def template_distance(templates, i, scale=1, cache=None):
+    """
+    Outline distance transform of rotation i, computed on first use and
+    then kept in the cache's memory LRU next to the templates.
+    """
+    if "key" not in templates:                  # not from a cache: nothing to key on
+        return distance_map(template_mask(templates, i), scale)
+
+    cache = cache or default_template_cache()
+    key = (templates["key"], int(i), scale)
+    entry = cache._recall(key)
+    if entry is None:
+        entry = {"distance": distance_map(template_mask(templates, i), scale)}
+        cache._remember(key, entry)
+    return entry["distance"]
+
+def _nbytes(entry):
+    return sum(v.nbytes for v in entry.values() if isinstance(v, np.ndarray))
+
+# ==========================================================
+# CACHE (decoded LRU in memory, npz LRU on disk)
+# ==========================================================
+class TemplateCache(CadCache):
+    """
+    Rendered templates keyed by content hash + scale (+ rotation step).
+    Disk entries are evicted like CadCache; recently used entries stay
+    loaded (up to memory_bytes, shared with their distance maps) so
+    per-frame lookups never touch the disk. Safe to share between threads.
+    """
+
+    def __init__(self, root=TEMPLATE_DIR, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES,
+                 memory_bytes=MEMORY_BYTES):
+        super().__init__(root, max_entries, max_bytes)
+        self.memory_bytes = memory_bytes
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.lock = threading.Lock()
+
+    def key(self, path, mm_per_px, rotation_step=DEFAULT_ROTATION_STEP_DEG):
+        return (f"{file_digest(path)}-v{EXTRACTOR_VERSION}"
+                f"-{mm_per_px:g}mmpx-{rotation_step:g}deg")
+
+    def _recall(self, key):
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+            return entry
+
+    def _remember(self, key, entry):
+        with self.lock:
+            old = self.memory.pop(key, None)
+            if old is not None:
+                self.memory_used -= _nbytes(old)
+            self.memory[key] = entry
+            self.memory_used += _nbytes(entry)
+            while self.memory_used > self.memory_bytes and self.memory:
+                self.memory_used -= _nbytes(self.memory.popitem(last=False)[1])
+
+    def get(self, key):
+        entry = self._recall(key)
+        if entry is not None:
+            return entry
+
+        entry_path = self._entry_path(key)
+        try:
+            with np.load(entry_path, allow_pickle=False) as z:
+                entry = {
+                    "angles": z["angles"],
+                    "boxes": z["boxes"],
+                    "starts": z["starts"],
+                    "bits": z["bits"],
+                    "size": int(z["size"]),
+                    "mm_per_px": float(z["mm_per_px"]),
+                    "key": key,
+                }
+        except (OSError, KeyError, ValueError):
+            return None
+
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+        self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        self._publish(key, lambda f: np.savez_compressed(
+            f, angles=entry["angles"], boxes=entry["boxes"], starts=entry["starts"],
+            bits=entry["bits"], size=entry["size"], mm_per_px=entry["mm_per_px"]))
+
+        entry["key"] = key
+        self._remember(key, entry)
+        self.evict()
+
+_default_cache = None
+
+def default_template_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TemplateCache()
+    return _default_cache
+
+def get_templates(path, mm_per_px, rotation_step=DEFAULT_ROTATION_STEP_DEG, cache=None):
+    """Cached render_templates()."""
+    cache = cache or default_template_cache()
+    key = cache.key(path, mm_per_px, rotation_step)
+
+    entry = cache.get(key)
+    if entry is None:
+        entry = render_templates(path, mm_per_px, rotation_step)
+        cache.put(key, entry)
+
+    return entry
+
+# ==========================================================
+# MAIN
+# ==========================================================
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("USAGE: python templates.py <input_file.dxf> <mm_per_px> [rotation_step_deg]")
+        sys.exit(1)
+
+    step = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_ROTATION_STEP_DEG
+    templates = get_templates(sys.argv[1], float(sys.argv[2]), step)
+
+    n, size = len(templates["angles"]), templates["size"]
+    print(f"\n{n} rotations of {size}x{size} px at {templates['mm_per_px']} mm/px "
+          f"({_nbytes(templates) / 1e6:.1f} MB packed)\n")
@@ -0,0 +1,266 @@
+import numpy as np
+
+# ==========================================================
+# CONFIG
+# ==========================================================
+ENDPOINT_TOL_MM = 1e-3      # endpoints closer than this are the same node
+CORNER_ANGLE_DEG = 10.0     # turning angle that counts as a corner (> arc step)
+
+CIRCLE_FIT_MIN_POINTS = 8       # fewer vertices is a polygon, not a circle
+CIRCLE_FIT_REL_TOL = 0.01       # max radial deviation as a fraction of r ...
+CIRCLE_FIT_ABS_TOL_MM = 0.01    # ... but never tighter than this
+
+_NEIGHBOURS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+
+# ==========================================================
+# LOOP CHAINING
+# ==========================================================
+def _cell(pt, tol):
+    return (int(round(pt[0] / tol)), int(round(pt[1] / tol)))
+
+class _EndpointGrid:
+    """Hash of quantized path endpoints; lookups check the 3x3 cell block."""
+
+    def __init__(self, paths, tol):
+        self.tol = tol
+        self.cells = {}
+        for i, p in enumerate(paths):
+            self.cells.setdefault(_cell(p[0], tol), []).append((i, 0))
+            self.cells.setdefault(_cell(p[-1], tol), []).append((i, 1))
+
+    def find(self, pt, used):
+        cx, cy = _cell(pt, self.tol)
+        for dx, dy in _NEIGHBOURS:
+            for i, end in self.cells.get((cx + dx, cy + dy), ()):
+                if used[i]:
+                    continue
+                yield i, end
+
+def _same(a, b, tol):
+    return abs(a[0] - b[0]) <= tol and abs(a[1] - b[1]) <= tol
+
+def chain_loops(paths, tol=ENDPOINT_TOL_MM):
+    """
+    Chain (points, closed) paths end-to-end in O(n).
+    Returns (closed loops, open chains) as lists of (N, 2) arrays; closed
+    loops do not repeat their first point.
+    """
+    loops = []
+    open_paths = []
+
+    for pts, closed in paths:
+        pts = np.asarray(pts, dtype=np.float64)
+        if len(pts) < 2:
+            continue
+        if _same(pts[0], pts[-1], tol):
+            if len(pts) > 3:
+                loops.append(pts[:-1])
+        elif closed:
+            loops.append(pts)
+        else:
+            open_paths.append(pts)
+
+    grid = _EndpointGrid(open_paths, tol)
+    used = [False] * len(open_paths)
+    chains = []
+
+    def extend(chain, tail):
+        # follow unused paths from `tail` until none continue the chain
+        while True:
+            for j, end in grid.find(tail, used):
+                seg = open_paths[j] if end == 0 else open_paths[j][::-1]
+                if not _same(seg[0], tail, tol):
+                    continue
+                used[j] = True
+                chain.append(seg[1:])
+                tail = seg[-1]
+                if _same(tail, chain[0][0], tol):
+                    return tail, True
+                break
+            else:
+                return tail, False
+
+    for i, pts in enumerate(open_paths):
+        if used[i]:
+            continue
+        used[i] = True
+
+        chain = [pts]
+        _, closed = extend(chain, pts[-1])
+        if not closed:
+            # grow backwards from the start as well
+            back = [pts[::-1]]
+            extend(back, pts[0])
+            rev = np.vstack(back)[::-1]
+            fwd = np.vstack(chain)
+            chains.append(np.vstack((rev[:-len(pts)], fwd)))
+            continue
+
+        loop = np.vstack(chain)
+        loops.append(loop[:-1])
+
+    return loops, chains
+
+# ==========================================================
+# LOOP STATS (vectorized per loop)
+# ==========================================================
+def loop_area(pts):
+    """Signed shoelace area (CCW positive)."""
+    x, y = pts[:, 0], pts[:, 1]
+    return 0.5 * float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1)))
+
+def loop_perimeter(pts):
+    return float(np.hypot(*(np.roll(pts, -1, axis=0) - pts).T).sum())
+
+def count_corners(pts, angle_deg=CORNER_ANGLE_DEG):
+    """Vertices where the outline turns by more than angle_deg."""
+    edges = np.roll(pts, -1, axis=0) - pts
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    edges = edges[lengths > 1e-9]
+    if len(edges) < 3:
+        return 0
+    prev = np.roll(edges, 1, axis=0)
+    cross = prev[:, 0] * edges[:, 1] - prev[:, 1] * edges[:, 0]
+    dot = (prev * edges).sum(axis=1)
+    turn = np.degrees(np.abs(np.arctan2(cross, dot)))
+    return int(np.count_nonzero(turn > angle_deg))
+
+def points_in_loop(points, loop):
+    """Even-odd ray casting of many points against one loop."""
+    points = np.atleast_2d(points)
+    px, py = points[:, 0:1], points[:, 1:2]
+    x0, y0 = loop[:, 0], loop[:, 1]
+    x1, y1 = np.roll(x0, -1), np.roll(y0, -1)
+
+    crosses = (y0 > py) != (y1 > py)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xint = x0 + (py - y0) * (x1 - x0) / (y1 - y0)
+    return np.count_nonzero(crosses & (px < xint), axis=1) % 2 == 1
+
+def dedupe_vertices(pts, tol=ENDPOINT_TOL_MM):
+    """Drop vertices that repeat the previous one (within tol), wrap included."""
+    step = np.hypot(*(pts - np.roll(pts, 1, axis=0)).T)
+    keep = step > tol
+    return pts[keep] if keep.any() else pts[:1]
+
+# ==========================================================
+# CIRCLE RECOVERY (batched least squares over all loops)
+# ==========================================================
+def fit_circles(loops, rel_tol=CIRCLE_FIT_REL_TOL, abs_tol=CIRCLE_FIT_ABS_TOL_MM,
+                min_points=CIRCLE_FIT_MIN_POINTS):
+    """
+    Algebraic (Kasa) circle fit of every loop in one pass.
+    Vertices and edge midpoints must all lie within max(abs_tol, rel_tol*r)
+    of the fitted circle, so chords (D-shapes) and coarse polygons fail.
+    Returns an (N, 4) array of r, cx, cy, max residual; NaN rows = not round.
+    """
+    out = np.full((len(loops), 4), np.nan)
+    idx = [i for i, l in enumerate(loops) if len(l) >= min_points]
+    if not idx:
+        return out
+
+    pts = np.vstack([loops[i] for i in idx])
+    counts = np.array([len(loops[i]) for i in idx])
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    owner = np.repeat(np.arange(len(idx)), counts)
+
+    # center each loop on its mean for a well conditioned solve
+    mean = np.add.reduceat(pts, starts) / counts[:, None]
+    x, y = (pts - mean[owner]).T
+    z = x * x + y * y
+
+    def sums(v):
+        return np.add.reduceat(v, starts)
+
+    sxx, syy, sxy = sums(x * x), sums(y * y), sums(x * y)
+    sx, sy = sums(x), sums(y)
+    A = np.stack([
+        np.stack([sxx, sxy, sx], -1),
+        np.stack([sxy, syy, sy], -1),
+        np.stack([sx, sy, counts.astype(np.float64)], -1),
+    ], 1)
+    b = np.stack([sums(z * x), sums(z * y), sums(z)], -1)
+
+    # singular systems (collinear points) fall out as non-finite fits
+    A = A + np.eye(3) * 1e-12 * np.abs(A).max(axis=(1, 2), keepdims=True)
+    sol = np.linalg.solve(A, b[..., None])[..., 0]
+    cx, cy = sol[:, 0] / 2, sol[:, 1] / 2
+    r = np.sqrt(np.maximum(sol[:, 2] + cx * cx + cy * cy, 0.0))
+
+    # residual over vertices and edge midpoints (wrap edge included)
+    nxt = np.arange(len(pts)) + 1
+    ends = starts + counts
+    nxt[ends - 1] = starts
+    mx, my = (x + x[nxt]) / 2, (y + y[nxt]) / 2
+    dev = np.maximum(np.abs(np.hypot(x - cx[owner], y - cy[owner]) - r[owner]),
+                     np.abs(np.hypot(mx - cx[owner], my - cy[owner]) - r[owner]))
+    resid = np.maximum.reduceat(dev, starts)
+
+    ok = np.isfinite(resid) & (r > 0) & (resid <= np.maximum(abs_tol, rel_tol * r))
+    rows = np.array(idx)[ok]
+    out[rows] = np.column_stack((r, cx + mean[:, 0], cy + mean[:, 1], resid))[ok]
+    return out
+
+def loop_circles(topology):
+    """Loops that fit a circle, as circle dicts (r, d, cx, cy)."""
+    return [
+        {"r": c["r"], "d": 2 * c["r"], "cx": c["cx"], "cy": c["cy"]}
+        for c in (l["circle"] for l in topology["loops"]) if c is not None
+    ]
+
+def _loop_record(pts, tol=ENDPOINT_TOL_MM):
+    pts = dedupe_vertices(pts, tol)
+    area = loop_area(pts)
+    return {
+        "points": pts,
+        "area": abs(area),
+        "ccw": area > 0,
+        "perimeter": loop_perimeter(pts),
+        "bbox": (float(pts[:, 0].min()), float(pts[:, 0].max()),
+                 float(pts[:, 1].min()), float(pts[:, 1].max())),
+        "corners": count_corners(pts),
+        "circle": None,
+        "role": "island",
+    }
+
+# ==========================================================
+# TOPOLOGY
+# ==========================================================
+def build_topology(paths, tol=ENDPOINT_TOL_MM):
+    """
+    Closed loops of a drawing with the outer profile and its holes.
+    Returns {"outer": loop|None, "holes": [...], "loops": [...],
+    "open_chains": n}; every loop has area, perimeter, bbox, corners and
+    circle (the fitted circle, or None when the loop is not round).
+    """
+    closed, chains = chain_loops(paths, tol)
+    loops = [_loop_record(p, tol) for p in closed]
+    loops.sort(key=lambda l: l["area"], reverse=True)
+
+    for loop, fit in zip(loops, fit_circles([l["points"] for l in loops])):
+        if not np.isnan(fit[0]):
+            r, cx, cy, resid = fit.tolist()
+            loop["circle"] = {"r": r, "cx": cx, "cy": cy, "residual": resid}
+
+    outer = loops[0] if loops else None
+    holes = []
+    if outer is not None:
+        outer["role"] = "outer"
+        inner = loops[1:]
+        if inner:
+            probes = np.array([l["points"][0] for l in inner])
+            inside = points_in_loop(probes, outer["points"])
+            for loop, ok in zip(inner, inside):
+                if ok:
+                    loop["role"] = "hole"
+                    holes.append(loop)
+
+    return {"outer": outer, "holes": holes, "loops": loops,
+            "open_chains": len(chains)}
+
+def loop_summary(topology):
+    """JSON-friendly loop stats (no point arrays)."""
+    return [
+        {k: v for k, v in loop.items() if k != "points"}
+        for loop in topology["loops"]
+    ]
@@ -1,6 +1,19 @@
+import csv
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cad"))
+from dimensions import compile_dimension_map
+from fingerprint import recipe_for_dimensions
+from part_events import PartAggregator
+
 # ===========================================================
 # CONFIG (CHANGE PER COMPONENT IF NEEDED)
 # ===========================================================
@@ -10,7 +23,11 @@ MEASURED_FILE = "cleaned_output.csv"
 ABS_TOL_MM = 2.0            # absolute tolerance (mm)
 REL_TOL_PERCENT = 20.0      # relative tolerance (%)
 
-OUTPUT_REPORT = "component_comparison_report.csv"
+OUTPUT_REPORT = "component_comparison_report.csv"     # one row per frame
+PART_REPORT = "component_part_report.csv"           # one verdict per part
+CHECKPOINT_FILE = "comparison_checkpoint.json"
+
+CHUNK_BYTES = 16 * 1024 * 1024  # measured log is read / compared this much at a time
 
 # ===========================================================
 # LOAD CAD VALUES (GENERIC)
@@ -41,84 +58,373 @@ def load_cad_values():
 # ===========================================================
 # LOAD MEASURED VALUES (GENERIC)
 # ===========================================================
-def load_measured_values():
-    df = pd.read_csv(MEASURED_FILE)
-
-    if "timestamp" not in df.columns:
+def measured_dim_columns(columns):
+    if "timestamp" not in columns:
         raise ValueError("Measured file must contain 'timestamp' column")
 
-    dim_columns = [c for c in df.columns if c.lower().endswith("_mm")]
+    dim_columns = [c for c in columns if c.lower().endswith("_mm")]
 
     if not dim_columns:
         raise ValueError("No dimension columns (_mm) found in measured file")
 
-    measurements = []
+    return dim_columns
 
-    for _, row in df.iterrows():
-        entry = {"timestamp": row["timestamp"]}
-        for col in dim_columns:
-            entry[col] = float(row[col])
-        measurements.append(entry)
+def read_header(path):
+    """(column names, byte offset of the first data row)"""
+    with open(path, "rb") as f:
+        line = f.readline()
+    return next(csv.reader([line.decode("utf-8-sig")])), len(line)
+
+def iter_measured_chunks(path, header, dim_columns, offset, chunk_bytes=CHUNK_BYTES,
+                         partial=True):
+    """
+    Measured frames after byte `offset`, about chunk_bytes at a time, as
+    (timestamp + float _mm columns DataFrame, byte offset past its last row).
+    Only whole rows are parsed; a last row without a newline is included
+    only when `partial` is set (it may still be being written).
+    """
+    with open(path, "rb") as f:
+        f.seek(offset)
+        carry = b""
+        while True:
+            data = f.read(chunk_bytes)
+            if not data:
+                break
+            data = carry + data
+            end = data.rfind(b"\n") + 1
+            block, carry = data[:end], data[end:]
+            offset += end
+            if block.strip():
+                yield _parse_rows(block, header, dim_columns), offset
 
-    return measurements, dim_columns
+        if partial and carry.strip():
+            yield _parse_rows(carry, header, dim_columns), offset + len(carry)
+
+def _parse_rows(block, header, dim_columns):
+    # timestamps stay text, so the frame report copies them verbatim
+    # whatever the other rows of the chunk look like
+    df = pd.read_csv(io.BytesIO(block), header=None, names=header,
+                     dtype={"timestamp": str})
+    return df[["timestamp"] + dim_columns].astype({c: float for c in dim_columns})
 
 # ===========================================================
 # ERROR CHECK
 # ===========================================================
 def check_error(meas, cad):
-    abs_err = abs(meas - cad)
-    rel_err = (abs_err / cad) * 100 if cad != 0 else 0
-    ok = abs_err <= ABS_TOL_MM and rel_err <= REL_TOL_PERCENT
+    """
+    Errors for scalars or whole arrays (meas (n, k) against cad (k,)).
+    Missing measurements (NaN) never pass.
+    """
+    meas = np.asarray(meas, dtype=np.float64)
+    cad = np.asarray(cad, dtype=np.float64)
+
+    abs_err = np.abs(meas - cad)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rel_err = np.where(cad != 0, abs_err / cad * 100, 0.0)
+    ok = (abs_err <= ABS_TOL_MM) & (rel_err <= REL_TOL_PERCENT)
     return abs_err, rel_err, ok
 
 # ===========================================================
 # GENERIC COMPARISON ENGINE
 # ===========================================================
+def match_cad_columns(dim_columns, cad_dims):
+    """
+    Measured column -> CAD value through the dimension ontology
+    (cad/dimensions.py), compiled once per inspection.
+    """
+    cad_keys = list(cad_dims)
+    part = recipe_for_dimensions(cad_keys)
+    mapping = compile_dimension_map(dim_columns, cad_keys, part)
+    return {col: cad_dims[cad_keys[i]] for col, i in mapping.items()}
+
+def compare_frame(measurements, matches):
+    """
+    Per-frame report for a block of measurements, all frames at once.
+    Unmatched dimension columns are skipped.
+    """
+    cols = list(matches)
+    cad = np.array([matches[c] for c in cols], dtype=np.float64)
+    meas = measurements[cols].to_numpy(dtype=np.float64)
+
+    abs_err, rel_err, ok = check_error(meas, cad)
+
+    out = {"timestamp": measurements["timestamp"].to_numpy()}
+    for i, col in enumerate(cols):
+        out[f"CAD_{col}"] = np.full(len(meas), cad[i])
+        out[f"MEAS_{col}"] = meas[:, i]
+        out[f"{col}_abs_err"] = abs_err[:, i]
+        out[f"{col}_rel_err_percent"] = rel_err[:, i]
+
+    out["status"] = np.where(ok.all(axis=1), "NOT DEFECTIVE", "DEFECTIVE")
+    return pd.DataFrame(out)
+
+def compare_parts(stats, matches):
+    """
+    One verdict per part event (part_events.PartAggregator stats): the
+    median of each dimension is checked against CAD like a single frame.
+    """
+    cols = list(matches)
+    cad = np.array([matches[c] for c in cols], dtype=np.float64)
+    median = stats["median"]
+
+    abs_err, rel_err, ok = check_error(median, cad)
+
+    out = {
+        "part_id": stats["part_id"],
+        "timestamp": stats["end"],
+        "start_timestamp": stats["start"],
+        "frames": stats["frames"],
+    }
+    for i, col in enumerate(cols):
+        out[f"CAD_{col}"] = np.full(len(median), cad[i])
+        out[f"MEAS_{col}"] = median[:, i]
+        out[f"{col}_trimmed_mean"] = stats["trimmed_mean"][:, i]
+        out[f"{col}_mad"] = stats["mad"][:, i]
+        out[f"{col}_missing_frames"] = stats["missing"][:, i]
+        out[f"{col}_abs_err"] = abs_err[:, i]
+        out[f"{col}_rel_err_percent"] = rel_err[:, i]
+
+    out["status"] = np.where(ok.all(axis=1), "NOT DEFECTIVE", "DEFECTIVE")
+    return pd.DataFrame(out)
+
+def new_part_aggregator(matches):
+    return PartAggregator(list(matches), [matches[c] for c in matches])
+
+def timestamp_seconds(timestamps):
+    """
+    Timestamps as float seconds: epoch numbers, else date strings (naive
+    ones taken as UTC). NaN for each value that is neither.
+    """
+    seconds = pd.to_numeric(timestamps, errors="coerce").astype(np.float64)
+    dated = seconds.isna() & timestamps.notna()
+    if dated.any():
+        dates = pd.to_datetime(timestamps[dated], format="mixed", utc=True, errors="coerce")
+        seconds[dated] = (dates - pd.Timestamp(0, tz="UTC")) / pd.Timedelta(seconds=1)
+    return seconds.to_numpy()
+
+def write_report(header, dim_columns, matches, offset, fresh, parts, close_parts,
+                 partial=True, chunk_bytes=CHUNK_BYTES):
+    """
+    Compare the log from byte `offset` chunk by chunk, writing (fresh) or
+    appending each chunk's frame rows to OUTPUT_REPORT and the verdicts of
+    parts that left the view to PART_REPORT as it goes. The part still in
+    view is only closed when close_parts is set. Frames whose timestamp
+    cannot be read are left out of the part aggregation only.
+    Returns counts and the byte offset reached.
+    """
+    summary = {"frames": 0, "defective": 0, "parts": 0, "defective_parts": 0,
+               "unaggregated": 0}
+    mode = "w" if fresh else "a"
+
+    def add_parts(stats, f):
+        df = compare_parts(stats, matches)
+        if len(df) or (fresh and f.tell() == 0):
+            df.to_csv(f, header=fresh and f.tell() == 0, index=False)
+        summary["parts"] += len(df)
+        summary["defective_parts"] += int((df["status"] == "DEFECTIVE").sum())
+
+    with open(OUTPUT_REPORT, mode, newline="") as f, open(PART_REPORT, mode, newline="") as pf:
+        for measured, offset in iter_measured_chunks(MEASURED_FILE, header, dim_columns,
+                                                     offset, chunk_bytes, partial):
+            df = compare_frame(measured, matches)
+            df.to_csv(f, header=fresh and summary["frames"] == 0, index=False)
+            summary["frames"] += len(df)
+            summary["defective"] += int((df["status"] == "DEFECTIVE").sum())
+
+            t = timestamp_seconds(measured["timestamp"])
+            timed = np.isfinite(t)
+            summary["unaggregated"] += int((~timed).sum())
+            add_parts(parts.add(t[timed],
+                                measured[list(matches)].to_numpy(dtype=np.float64)[timed]), pf)
+
+        if fresh and summary["frames"] == 0:
+            empty = pd.DataFrame(columns=["timestamp"] + dim_columns)
+            compare_frame(empty, matches).to_csv(f, index=False)
+
+        if close_parts:
+            add_parts(parts.finish(), pf)
+        else:
+            add_parts(parts.add([], []), pf)
+
+    summary["offset"] = offset
+    return summary
+
 def compare_components():
+    """Full report, streamed: memory stays flat whatever the log size."""
     cad_dims = load_cad_values()
-    measured_list, dim_columns = load_measured_values()
+    header, data_start = read_header(MEASURED_FILE)
+    dim_columns = measured_dim_columns(header)
+    matches = match_cad_columns(dim_columns, cad_dims)
 
-    report = []
+    parts = new_part_aggregator(matches)
+    summary = write_report(header, dim_columns, matches, data_start, True, parts, True)
 
-    for m in measured_list:
-        row_out = {"timestamp": m["timestamp"]}
-        overall_ok = True
+    print("\n=========== FINAL COMPONENT DEFECT REPORT ===========\n")
+    print(f"Frames compared : {summary['frames']}")
+    print(f"Parts inspected : {summary['parts']} "
+          f"({parts.skipped} events under {parts.min_frames} frames ignored)")
+    print(f"DEFECTIVE       : {summary['defective_parts']}")
+    print(f"NOT DEFECTIVE   : {summary['parts'] - summary['defective_parts']}")
+    if summary["unaggregated"]:
+        print(f"\n{summary['unaggregated']} frames with unreadable timestamps "
+              f"are in the per-frame report only")
+    print(f"\nSaved as {PART_REPORT} (per part) and {OUTPUT_REPORT} (per frame)\n")
+    return summary
 
-        for col in dim_columns:
-            meas_val = m[col]
+# ===========================================================
+# INCREMENTAL (APPEND-ONLY) COMPARISON
+# ===========================================================
+def load_checkpoint():
+    try:
+        with open(CHECKPOINT_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
 
-            # try matching CAD key using name similarity
-            key = col.replace("_mm", "").lower()
+def save_checkpoint(state):
+    tmp_path = CHECKPOINT_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, CHECKPOINT_FILE)
 
-            cad_match = None
-            for cad_key in cad_dims:
-                if cad_key in key or key in cad_key:
-                    cad_match = cad_dims[cad_key]
-                    break
+def _first_row(path, data_start):
+    with open(path, "rb") as f:
+        f.seek(data_start)
+        return f.readline().decode("utf-8", "replace")
 
-            if cad_match is None:
-                continue  # skip unmatched dimension
+def _row_before(path, offset, max_bytes=4096):
+    """Last complete row ending at byte `offset` (checks nothing was rewritten)."""
+    with open(path, "rb") as f:
+        f.seek(max(offset - max_bytes, 0))
+        data = f.read(min(offset, max_bytes))
+    return data[data.rstrip(b"\n").rfind(b"\n") + 1:].decode("utf-8", "replace")
 
-            abs_err, rel_err, ok = check_error(meas_val, cad_match)
-            overall_ok = overall_ok and ok
+def compare_incremental(close_parts=False):
+    """
+    Compare only the rows appended to MEASURED_FILE since the last run and
+    append their verdicts to the reports; the part still in view (and a
+    last row without a newline) is kept for later unless close_parts is set. Starts over (full
+    reports) when the CAD values, the log's header or already-compared
+    rows changed, the log shrank or a report is gone.
+    """
+    cad_dims = load_cad_values()
+    header, data_start = read_header(MEASURED_FILE)
+    dim_columns = measured_dim_columns(header)
+    matches = match_cad_columns(dim_columns, cad_dims)
 
-            row_out[f"CAD_{col}"] = cad_match
-            row_out[f"MEAS_{col}"] = meas_val
-            row_out[f"{col}_abs_err"] = abs_err
-            row_out[f"{col}_rel_err_percent"] = rel_err
+    identity = {
+        "measured_file": os.path.abspath(MEASURED_FILE),
+        "header": header,
+        "first_row": _first_row(MEASURED_FILE, data_start),
+        "cad": cad_dims,
+    }
 
-        row_out["status"] = "NOT DEFECTIVE" if overall_ok else "DEFECTIVE"
-        report.append(row_out)
+    state = load_checkpoint()
+    fresh = (
+        state is None
+        or any(state.get(k) != v for k, v in identity.items())
+        or state["offset"] > os.path.getsize(MEASURED_FILE)
+        or state["last_row"] != _row_before(MEASURED_FILE, state["offset"])
+        or "parts" not in state
+        or not os.path.exists(OUTPUT_REPORT)
+        or not os.path.exists(PART_REPORT)
+    )
+    offset = data_start if fresh else state["offset"]
+    rows = 0 if fresh else state["rows"]
 
-    df = pd.DataFrame(report)
-    df.to_csv(OUTPUT_REPORT, index=False)
+    parts = new_part_aggregator(matches)
+    if not fresh:
+        parts.restore(state["parts"])
 
-    print("\n=========== FINAL COMPONENT DEFECT REPORT ===========\n")
-    print(df)
-    print(f"\nSaved as {OUTPUT_REPORT}\n")
+    # the writer has stopped when parts are closed: its last row is complete
+    summary = write_report(header, dim_columns, matches, offset, fresh, parts, close_parts,
+                           partial=close_parts)
+    end = summary["offset"]
+
+    save_checkpoint(dict(identity, offset=end, rows=rows + summary["frames"],
+                         last_row=_row_before(MEASURED_FILE, end), parts=parts.state()))
+
+    print(f"\n{'Full' if fresh else 'Incremental'} comparison: "
+          f"{summary['frames']} new frames, {rows + summary['frames']} total; "
+          f"{summary['parts']} parts closed, {summary['defective_parts']} DEFECTIVE"
+          f"{'' if parts.open is None else ' (1 part still in view)'}")
+    print(f"Saved as {PART_REPORT} and {OUTPUT_REPORT}\n")
+
+# ===========================================================
+# SELF CHECK (incremental runs == one full run)
+# ===========================================================
+def _garble_timestamp(data, header):
+    """`data` with the timestamp of its middle row replaced by junk."""
+    start = data.find(b"\n", len(data) // 2) + 1
+    end = data.find(b"\n", start)
+    if start == 0 or end < 0:
+        return data
+    fields = data[start:end].split(b",")
+    fields[header.index("timestamp")] = b"garbled"
+    return data[:start] + b",".join(fields) + data[end:]
+
+def self_check(measured_file=None, pieces=7):
+    """
+    Garble the timestamp of one row of `measured_file` (default:
+    MEASURED_FILE), check a full run leaves out just that frame from the
+    parts, then append the log to a scratch copy in `pieces` byte ranges,
+    cutting rows in half, with an --incremental run after each, and check
+    both reports match the full run.
+    """
+    cad_file = os.path.abspath(CAD_FILE)
+    measured_file = os.path.abspath(measured_file or MEASURED_FILE)
+    header, _ = read_header(measured_file)
+    with open(measured_file, "rb") as f:
+        clean = f.read()
+    data = _garble_timestamp(clean, header)
+    header_end = data.index(b"\n") + 1
+
+    cwd = os.getcwd()
+    work = tempfile.mkdtemp(prefix="compare_check_")
+    try:
+        os.chdir(work)
+        shutil.copy(cad_file, CAD_FILE)
+        with open(MEASURED_FILE, "wb") as f:
+            f.write(clean)
+        unreadable = compare_components()["unaggregated"]
+        with open(MEASURED_FILE, "wb") as f:
+            f.write(data)
+        garbled_ok = compare_components()["unaggregated"] == unreadable + (data != clean)
+        with open(PART_REPORT, "rb") as f:
+            full_parts = f.read()
+        with open(OUTPUT_REPORT, "rb") as f:
+            full_frames = f.read()
+
+        for path in (PART_REPORT, OUTPUT_REPORT):
+            os.remove(path)
+        cuts = np.linspace(header_end, len(data), pieces + 1).astype(int)
+        with open(MEASURED_FILE, "wb") as f:
+            f.write(data[:header_end])
+        for i, (a, b) in enumerate(zip(cuts[:-1], cuts[1:])):
+            with open(MEASURED_FILE, "ab") as f:
+                f.write(data[a:b])
+            compare_incremental(close_parts=i == pieces - 1)
+
+        with open(PART_REPORT, "rb") as f:
+            parts_ok = f.read() == full_parts
+        with open(OUTPUT_REPORT, "rb") as f:
+            frames_ok = f.read() == full_frames
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work, ignore_errors=True)
+
+    print(f"\nSelf check ({pieces} appends): part report "
+          f"{'OK' if parts_ok else 'MISMATCH'}, frame report {'OK' if frames_ok else 'MISMATCH'}, "
+          f"garbled timestamp {'OK' if garbled_ok else 'MISMATCH'}\n")
+    return parts_ok and frames_ok and garbled_ok
 
 # ===========================================================
 # MAIN
 # ===========================================================
 if __name__ == "__main__":
-    compare_components()
+    if "--self-check" in sys.argv[1:]:
+        sys.exit(0 if self_check() else 1)
+    elif "--incremental" in sys.argv[1:]:
+        compare_incremental(close_parts="--close-parts" in sys.argv[1:])
+    else:
+        compare_components()
@@ -0,0 +1,210 @@
+import numpy as np
+
+# ===========================================================
+# CONFIG
+# ===========================================================
+PART_GAP_S = 1.0            # no frame for this long => the part has left the view
+MIN_PART_FRAMES = 3         # shorter events are treated as spurious detections
+
+HIST_BIN_MM = 0.01          # histogram resolution (robust stats are exact to +-bin/2)
+HIST_RANGE_MM = 5.0         # bins span CAD +- range; the end bins also catch (and sum) the rest
+TRIM_FRACTION = 0.1         # trimmed mean drops this fraction at each end
+TAIL_UNIT_MM = 1e-6         # end-bin sums kept as integers of this (exact in any order)
+
+PART_BATCH = 256            # parts histogrammed at once (bounds memory per chunk)
+
+# ===========================================================
+# ROBUST STATISTICS FROM HISTOGRAMS
+# ===========================================================
+def _weighted_median(values, counts):
+    """Median of `values` (..., bins) repeated `counts` times, along the last axis."""
+    n = counts.sum(axis=-1, keepdims=True)
+    c = np.cumsum(counts, axis=-1)
+    lo = np.argmax(c >= (n + 1) // 2, axis=-1)[..., None]
+    hi = np.argmax(c >= n // 2 + 1, axis=-1)[..., None]
+    med = (np.take_along_axis(values, lo, -1) + np.take_along_axis(values, hi, -1)) / 2
+    return np.where(n > 0, med, np.nan)[..., 0]
+
+def histogram_stats(counts, tails, centers, trim=TRIM_FRACTION):
+    """
+    median, trimmed mean and MAD (mm) of every (part, dimension) histogram.
+    counts: (parts, dims, bins); tails: (parts, dims, 2) sums of the values
+    in the first / last bin (TAIL_UNIT_MM); centers: (dims, bins). NaN where empty.
+    """
+    counts = counts.astype(np.int64)
+    values = np.broadcast_to(centers, counts.shape).copy()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for end, i in ((0, 0), (1, -1)):
+            values[..., i] = np.where(counts[..., i] > 0,
+                                      tails[..., end] * TAIL_UNIT_MM / counts[..., i],
+                                      values[..., i])
+    n = counts.sum(axis=-1)
+
+    median = _weighted_median(values, counts)
+
+    dev = np.abs(values - np.nan_to_num(median)[..., None])
+    order = np.argsort(dev, axis=-1)
+    mad = _weighted_median(np.take_along_axis(dev, order, -1),
+                           np.take_along_axis(counts, order, -1))
+
+    # ranks [g, n - g) kept, bin by bin
+    g = np.floor(n * trim).astype(np.int64)[..., None]
+    top = (n[..., None] - g)
+    c = np.cumsum(counts, axis=-1)
+    kept = np.clip(c, g, top) - np.clip(c - counts, g, top)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        trimmed = (kept * values).sum(axis=-1) / kept.sum(axis=-1)
+
+    return median, np.where(n > 0, trimmed, np.nan), mad
+
+# ===========================================================
+# PART EVENTS
+# ===========================================================
+class PartAggregator:
+    """
+    Groups consecutive frames into part events (split at timestamp gaps
+    longer than gap_s) and keeps one fixed-bin histogram per dimension of
+    the part in view: O(1) work and memory per frame. Closed parts come
+    back as robust per-dimension statistics.
+    """
+
+    def __init__(self, columns, cad, gap_s=PART_GAP_S, min_frames=MIN_PART_FRAMES,
+                 bin_mm=HIST_BIN_MM, range_mm=HIST_RANGE_MM):
+        self.columns = list(columns)
+        self.cad = np.asarray(cad, dtype=np.float64)
+        self.gap_s = gap_s
+        self.min_frames = min_frames
+        self.bin_mm = bin_mm
+
+        self.bins = int(round(2 * range_mm / bin_mm)) + 1
+        self.lo = self.cad - range_mm - bin_mm / 2
+        self.centers = np.round(self.lo[:, None] + (np.arange(self.bins) + 0.5) * bin_mm, 9)
+
+        self.next_id = 1
+        self.skipped = 0
+        self.open = None        # part in view: start, end, frames, counts, missing
+
+    # -------------------------------------------------------
+    def _empty_part(self, n=1):
+        return {
+            "start": np.full(n, np.nan),
+            "end": np.full(n, np.nan),
+            "frames": np.zeros(n, np.int64),
+            "counts": np.zeros((n, len(self.columns), self.bins), np.int32),
+            "tails": np.zeros((n, len(self.columns), 2), np.int64),
+            "missing": np.zeros((n, len(self.columns)), np.int64),
+        }
+
+    def add(self, timestamps, values):
+        """
+        Feed frames in time order: timestamps (n,), values (n, dims) in mm,
+        NaN for missing. Returns the stats of parts closed by these frames.
+        """
+        t = np.asarray(timestamps, dtype=np.float64)
+        if not len(t):
+            return self._stats(self._empty_part(0))
+        values = np.asarray(values, dtype=np.float64)
+
+        new = np.empty(len(t), dtype=bool)
+        new[0] = self.open is None or t[0] - self.open["end"][0] > self.gap_s
+        new[1:] = np.diff(t) > self.gap_s
+
+        # every batch starts a new part, so the part in view carries over
+        part = np.cumsum(new)
+        cuts = np.searchsorted(part, np.arange(PART_BATCH, part[-1] + 1, PART_BATCH))
+        bounds = list(zip([0, *cuts.tolist()], [*cuts.tolist(), len(t)]))
+        batches = [self._add(t[a:b], values[a:b], new[a:b]) for a, b in bounds if a < b]
+        return {key: np.concatenate([s[key] for s in batches]) for key in batches[0]}
+
+    def _add(self, t, values, new):
+        part = np.cumsum(new)               # 0 = the part already in view
+        n_parts = int(part[-1]) + 1
+
+        acc = self._empty_part(n_parts)
+        if self.open is not None:
+            for key in acc:
+                acc[key][0] = self.open[key][0]
+
+        first = np.flatnonzero(new)
+        acc["start"][part[first]] = t[first]
+        last = np.flatnonzero(np.append(part[1:] != part[:-1], True))
+        acc["end"][part[last]] = t[last]
+        acc["frames"] += np.bincount(part, minlength=n_parts)
+
+        k = len(self.columns)
+        finite = np.isfinite(values)
+        slot = part[:, None] * k + np.arange(k)       # (part, dimension) of every value
+        acc["missing"] += np.bincount(slot[~finite], minlength=n_parts * k).reshape(n_parts, k)
+
+        b = np.clip(np.floor((values - self.lo) / self.bin_mm), 0, self.bins - 1)
+        flat = slot * self.bins + np.nan_to_num(b).astype(np.int64)
+        acc["counts"] += np.bincount(flat[finite], minlength=acc["counts"].size
+                                     ).reshape(acc["counts"].shape).astype(np.int32)
+
+        units = np.round(np.nan_to_num(values) / TAIL_UNIT_MM).astype(np.int64)
+        for end, edge in ((0, 0), (1, self.bins - 1)):
+            rows, dims = np.nonzero(finite & (b == edge))
+            np.add.at(acc["tails"], (part[rows], dims, end), units[rows, dims])
+
+        self.open = {key: v[-1:].copy() for key, v in acc.items()}
+        closed = {key: v[:-1] for key, v in acc.items()}
+        return self._stats(closed)
+
+    def finish(self):
+        """Close the part in view (the log has ended) and return its stats."""
+        part, self.open = self.open, None
+        return self._stats(part if part is not None else self._empty_part(0))
+
+    # -------------------------------------------------------
+    def _stats(self, parts):
+        keep = (parts["frames"] > 0) & (parts["frames"] >= self.min_frames)
+        self.skipped += int(((parts["frames"] > 0) & ~keep).sum())
+
+        n = int(keep.sum())
+        ids = np.arange(self.next_id, self.next_id + n)
+        self.next_id += n
+
+        median, trimmed, mad = histogram_stats(parts["counts"][keep], parts["tails"][keep],
+                                               self.centers)
+        return {
+            "part_id": ids,
+            "start": parts["start"][keep],
+            "end": parts["end"][keep],
+            "frames": parts["frames"][keep],
+            "missing": parts["missing"][keep],
+            "median": median,
+            "trimmed_mean": trimmed,
+            "mad": mad,
+        }
+
+    # -------------------------------------------------------
+    def state(self):
+        """JSON-friendly state (histograms stored sparsely) for checkpoints."""
+        state = {"next_id": self.next_id, "skipped": self.skipped, "open": None}
+        if self.open is not None:
+            dims, bins = np.nonzero(self.open["counts"][0])
+            state["open"] = {
+                "start": float(self.open["start"][0]),
+                "end": float(self.open["end"][0]),
+                "frames": int(self.open["frames"][0]),
+                "missing": self.open["missing"][0].tolist(),
+                "tails": self.open["tails"][0].tolist(),
+                "bins": [dims.tolist(), bins.tolist(),
+                         self.open["counts"][0][dims, bins].tolist()],
+            }
+        return state
+
+    def restore(self, state):
+        self.next_id = state["next_id"]
+        self.skipped = state["skipped"]
+        self.open = None
+        if state["open"] is not None:
+            s = state["open"]
+            part = self._empty_part()
+            part["start"][0], part["end"][0], part["frames"][0] = s["start"], s["end"], s["frames"]
+            part["missing"][0] = s["missing"]
+            part["tails"][0] = s["tails"]
+            dims, bins, counts = s["bins"]
+            part["counts"][0][dims, bins] = counts
+            self.open = part
+        return self
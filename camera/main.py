@@ -3,6 +3,10 @@ import sys
 import os
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "cad"))
+from cad_extractor import extract_cad, component_type, write_measurements_csv
+from fingerprint import VISION_SCRIPTS
+
 # ======================================================
 # ARGUMENT CHECK
 # ======================================================
@@ -24,10 +28,11 @@ CAD_OUTPUT = "dxf_measurements.csv"
 print("\n[STEP 1] Extracting CAD dimensions...\n")
 
 if CAD_FILE.lower().endswith(".dxf"):
-    subprocess.run(
-        ["python", os.path.join("cad", "cad_extractor.py"), CAD_FILE],
-        check=True
-    )
+    cad = extract_cad(CAD_FILE)
+    write_measurements_csv(cad.rows, CAD_OUTPUT)
+    print(f"Detected Part : {cad.part}")
+    for dim_type, value in cad.rows:
+        print(f"  {dim_type:<15}: {value:.3f} mm")
 
 elif CAD_FILE.lower().endswith(".stl"):
     subprocess.run(
@@ -39,31 +44,23 @@ else:
     raise ValueError("Unsupported CAD format (only DXF / STL supported)")
 
 # ======================================================
-# STEP 2: IDENTIFY PART TYPE FROM CAD CSV
+# STEP 2: IDENTIFY PART TYPE FROM CAD DIMENSIONS
 # ======================================================
 print("[STEP 2] Identifying component type...")
 
-if not os.path.exists(CAD_OUTPUT):
-    raise FileNotFoundError(f"CAD output file not found: {CAD_OUTPUT}")
-
-cad_df = pd.read_csv(CAD_OUTPUT)
-
-if "type" not in cad_df.columns:
-    raise ValueError("CAD CSV must contain a 'type' column")
+if CAD_FILE.lower().endswith(".dxf"):
+    part = cad.component_type
 
-types = cad_df["type"].astype(str).str.lower().tolist()
+else:
+    if not os.path.exists(CAD_OUTPUT):
+        raise FileNotFoundError(f"CAD output file not found: {CAD_OUTPUT}")
 
-if "outer_diameter" in types and "inner_diameter" in types:
-    part = "bearing"
+    cad_df = pd.read_csv(CAD_OUTPUT)
 
-elif "outer_width" in types and "inner_diameter" in types:
-    part = "square_washer"
+    if "type" not in cad_df.columns:
+        raise ValueError("CAD CSV must contain a 'type' column")
 
-elif "across_flats" in types:
-    part = "hex_nut"
-
-else:
-    part = "washer"
+    part = component_type(cad_df["type"].astype(str).str.lower().tolist())
 
 print(f"Detected Part Type: {part.upper()}")
 
@@ -72,14 +69,7 @@ print(f"Detected Part Type: {part.upper()}")
 # ======================================================
 print("\n[STEP 3] Starting live inspection...\n")
 
-VISION_SCRIPT = {
-    "bearing": os.path.join("vision", "bearing.py"),
-    "washer": os.path.join("vision", "washer.py"),
-    "square_washer": os.path.join("vision", "square_washer.py"),
-    "hex_nut": os.path.join("vision", "nut.py")
-}
-
-script_path = VISION_SCRIPT.get(part)
+script_path = VISION_SCRIPTS.get(part)
 
 if script_path is None:
     raise ValueError(f"No vision script mapped for part type: {part}")
@@ -105,7 +95,8 @@ process.wait()
 print("\n[STEP 4] Comparing CAD and measured dimensions...\n")
 
 subprocess.run(
-    ["python", os.path.join("comparison", "compare_results.py")],
+    ["python", os.path.join("comparison", "compare_results.py"),
+     "--incremental", "--close-parts"],
     check=True
 )
 